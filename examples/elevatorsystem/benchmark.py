@@ -0,0 +1,54 @@
+import random
+import time
+
+from main import (ElevatorController, EventScheduler, NearestCarStrategy, CollectiveControlStrategy,
+                  DestinationDispatchStrategy, generate_traffic, replay_traffic)
+
+FLOORS = 40
+SIM_SECONDS = 3600
+REQUEST_INTERVAL = 30.0
+
+def run(num_elevators: int) -> float:
+    rng = random.Random(42)
+    scheduler = EventScheduler(simulated=True)
+    controller = ElevatorController(num_elevators, 10, scheduler, verbose=False)
+
+    def arrival():
+        src = rng.randrange(FLOORS)
+        dest = rng.randrange(FLOORS)
+        if src != dest:
+            controller.request_elevator(src, dest)
+        scheduler.schedule(rng.expovariate(num_elevators / REQUEST_INTERVAL), arrival)
+
+    scheduler.schedule(0, arrival)
+    start = time.perf_counter()
+    scheduler.run_until(SIM_SECONDS)
+    return time.perf_counter() - start
+
+def benchmark_engine():
+    for num_elevators in (10, 100, 1000):
+        elapsed = run(num_elevators)
+        print(f"{num_elevators:>5} elevators: {elapsed:.2f}s wall clock per simulated hour")
+
+def benchmark_strategies():
+    strategies = (NearestCarStrategy(), CollectiveControlStrategy(), DestinationDispatchStrategy())
+    for pattern in ("up-peak", "down-peak", "inter-floor"):
+        traffic = generate_traffic(pattern, floors=20, duration=SIM_SECONDS, rate=0.5, seed=7)
+        print(f"{pattern} ({len(traffic)} requests, 8 elevators)")
+        for strategy in strategies:
+            stats = replay_traffic(8, 10, traffic, strategy, duration=SIM_SECONDS)
+            print(f"  {type(strategy).__name__:<28} avg wait {stats['avg_wait']:6.1f}s  p95 wait {stats['p95_wait']:6.1f}s  "
+                  f"avg trip {stats['avg_trip']:5.1f}s  served/min {stats['served_per_min']:5.1f}")
+
+def benchmark_batching():
+    traffic = generate_traffic("up-peak", floors=20, duration=1800, rate=2.0, seed=3)
+    print(f"saturated up-peak ({len(traffic)} requests, 6 elevators of capacity 8)")
+    for batch_window in (0.0, 2.0, 5.0):
+        stats = replay_traffic(6, 8, traffic, duration=1800, batch_window=batch_window)
+        print(f"  batch window {batch_window:3.1f}s  avg wait {stats['avg_wait']:6.1f}s  p95 wait {stats['p95_wait']:7.1f}s  "
+              f"served/min {stats['served_per_min']:5.1f}  max load {stats['max_load']}")
+
+if __name__ == "__main__":
+    benchmark_strategies()
+    benchmark_batching()
+    benchmark_engine()
@@ -1,110 +1,452 @@
 from enum import Enum
-from typing import List, Set
+from typing import List, Set, Callable, Optional, Dict
+from abc import ABC, abstractmethod
 import threading
+import random
+import csv
+import heapq
+import itertools
 import time
+from array import array
 
 class Direction(Enum):
     UP = 1
     DOWN = 2
     IDLE = 3
 
+class EventScheduler:
+    def __init__(self, simulated: bool = False):
+        self.simulated = simulated
+        self.events: List[tuple] = []
+        self.seq = itertools.count()
+        self.sim_time = 0.0
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        self.is_running = True
+        self.thread: Optional[threading.Thread] = None
+
+    def now(self) -> float:
+        return self.sim_time if self.simulated else time.monotonic()
+
+    def schedule(self, delay: float, callback: Callable[[], None]):
+        with self.lock:
+            heapq.heappush(self.events, (self.now() + delay, next(self.seq), callback))
+            if not self.simulated:
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self.run_loop, name="elevator-scheduler", daemon=True)
+                    self.thread.start()
+                self.wakeup.notify()
+
+    def run_loop(self):
+        while True:
+            with self.lock:
+                while self.is_running and (not self.events or self.events[0][0] > time.monotonic()):
+                    self.wakeup.wait(self.events[0][0] - time.monotonic() if self.events else None)
+                if not self.is_running:
+                    return
+                _, _, callback = heapq.heappop(self.events)
+            self.fire(callback)
+
+    def run_until(self, until: float):
+        while True:
+            with self.lock:
+                if not self.events or self.events[0][0] > until:
+                    if until != float("inf"):
+                        self.sim_time = max(self.sim_time, until)
+                    return
+                self.sim_time, _, callback = heapq.heappop(self.events)
+            self.fire(callback)
+
+    def fire(self, callback: Callable[[], None]):
+        try:
+            callback()
+        except Exception as e:
+            print(f"scheduled event {getattr(callback, '__qualname__', callback)} failed: {e}")
+
+    def run(self):
+        self.run_until(float("inf"))
+
+    def stop(self):
+        with self.lock:
+            self.is_running = False
+            self.wakeup.notify()
+
+DIRECTION_CODES = {Direction.UP: 1, Direction.DOWN: -1, Direction.IDLE: 0}
+
+class FleetState:
+    def __init__(self, num_elevators: int):
+        self.floor = array("d", [0.0] * num_elevators)
+        self.target = array("d", [0.0] * num_elevators)
+        self.departed_at = array("d", [0.0] * num_elevators)
+        self.floor_time = array("d", [1.0] * num_elevators)
+        self.direction = array("b", [0] * num_elevators)
+        self.load = array("i", [0] * num_elevators)
+        self.pending = array("i", [0] * num_elevators)
+
+    def update(self, elevator: "Elevator"):
+        i = elevator.id
+        self.floor[i] = elevator.floor
+        self.target[i] = elevator.floor if elevator.target is None else elevator.target
+        self.departed_at[i] = elevator.departed_at
+        self.floor_time[i] = elevator.floor_time
+        self.direction[i] = DIRECTION_CODES[elevator.direction]
+        self.load[i] = elevator.current_load
+        self.pending[i] = len(elevator.stops)
+
+    def current_floors(self, now: float) -> List[int]:
+        floors = []
+        for floor, target, departed_at, floor_time in zip(self.floor, self.target, self.departed_at, self.floor_time):
+            if target == floor:
+                floors.append(int(floor))
+            elif target > floor:
+                floors.append(int(min(floor + (now - departed_at) / floor_time, target)))
+            else:
+                floors.append(int(max(floor - (now - departed_at) / floor_time, target)))
+        return floors
+
 class Elevator:
-    def __init__(self, id: int, capacity: int):
+    def __init__(self, id: int, capacity: int, scheduler: EventScheduler, floor_time: float = 1.0, verbose: bool = True,
+                 fleet: Optional[FleetState] = None):
         self.id = id
         self.capacity = capacity
-        self.current_floor = 0
+        self.floor = 0
         self.current_load = 0
         self.direction: Direction = Direction.IDLE
         self.stops: Set[int] = set()
-        
+        self.up_stops: List[int] = []
+        self.down_stops: List[int] = []
+
+        self.scheduler = scheduler
+        self.floor_time = floor_time
+        self.verbose = verbose
         self.lock = threading.Lock()
-        self.is_running = True
-        self.thread = threading.Thread(target=self.run_loop)
-        self.thread.start()
+        self.target: Optional[int] = None
+        self.departed_at = 0.0
+        self.travel_token = 0
+        self.fleet = fleet
+        self.on_stop: Optional[Callable[["Elevator", int], None]] = None
+        self.publish_state()
+
+    def publish_state(self):
+        if self.fleet:
+            self.fleet.update(self)
+
+    def position(self, now: float) -> float:
+        if self.target is None:
+            return float(self.floor)
+        moved = (now - self.departed_at) / self.floor_time
+        if self.target > self.floor:
+            return min(self.floor + moved, self.target)
+        return max(self.floor - moved, self.target)
+
+    @property
+    def current_floor(self) -> int:
+        return int(self.position(self.scheduler.now()))
+
+    def next_stop(self) -> Optional[int]:
+        return self.target
 
     def add_stop(self, floor: int):
         with self.lock:
+            if floor in self.stops:
+                return
             self.stops.add(floor)
 
+            now = self.scheduler.now()
+            pos = self.position(now)
+            moving_up = self.target is not None and self.target > self.floor
+            moving_down = self.target is not None and self.target < self.floor
+            if floor > pos or (floor == pos and not moving_down):
+                heapq.heappush(self.up_stops, floor)
+            else:
+                heapq.heappush(self.down_stops, -floor)
+
             if self.direction == Direction.IDLE:
-                if floor > self.current_floor:
-                    self.direction = Direction.UP
-                elif floor < self.current_floor:
-                    self.direction = Direction.DOWN
+                self.direction = Direction.DOWN if floor < pos else Direction.UP
+
+            if self.target is None:
+                self.depart(now)
+            elif (moving_up and pos <= floor < self.target) or (moving_down and self.target < floor <= pos):
+                self.travel_to(floor, now)
+            self.publish_state()
 
     def open_doors(self):
-        print(f"elevator {self.id} opened at {self.current_floor}")
+        if self.verbose:
+            print(f"elevator {self.id} opened at {self.floor}")
+        if self.on_stop:
+            floor = self.floor
+            self.scheduler.schedule(0, lambda: self.on_stop(self, floor))
 
-    def run_loop(self):
-        while self.is_running:
-            with self.lock:
-                if self.current_floor in self.stops:
-                    self.open_doors()
-                    self.stops.remove(self.current_floor)
-                if not self.stops:
-                    self.direction = Direction.IDLE
-                else:
-                    self.move_next_step()
-            time.sleep(1)
-    
-    def move_next_step(self):
-        if self.direction == Direction.UP:
-            if any(f > self.current_floor for f in self.stops):
-                self.current_floor += 1
-                print(f"elevator {self.id} moving up to {self.current_floor}")
-            else:
-                self.direction = Direction.DOWN
+    def peek(self, heap: List[int], sign: int) -> Optional[int]:
+        while heap and sign * heap[0] not in self.stops:
+            heapq.heappop(heap)
+        return sign * heap[0] if heap else None
+
+    def depart(self, now: float):
+        if self.floor in self.stops:
+            self.open_doors()
+            self.stops.remove(self.floor)
+
+        up = self.peek(self.up_stops, 1)
+        down = self.peek(self.down_stops, -1)
+        if self.direction == Direction.DOWN and down is None:
+            self.direction = Direction.UP
+        elif self.direction != Direction.DOWN and up is None:
+            self.direction = Direction.DOWN
+
+        target = up if self.direction == Direction.UP else down
+        if target is None:
+            self.direction = Direction.IDLE
+            return
+        self.departed_at = now
+        self.travel_to(target, now)
+
+    def travel_to(self, floor: int, now: float):
+        self.target = floor
+        self.travel_token += 1
+        token = self.travel_token
+        arrival = self.departed_at + abs(floor - self.floor) * self.floor_time
+        self.scheduler.schedule(max(0.0, arrival - now), lambda: self.arrive(token))
+
+    def arrive(self, token: int):
+        with self.lock:
+            if token != self.travel_token:
+                return
+            if self.verbose and self.target != self.floor:
+                print(f"elevator {self.id} moving {'up' if self.target > self.floor else 'down'} to {self.target}")
+            self.floor = self.target
+            self.target = None
+            self.depart(self.scheduler.now())
+            self.publish_state()
+
+class Request:
+    def __init__(self, src: int, dest: int, requested_at: float):
+        self.src = src
+        self.dest = dest
+        self.requested_at = requested_at
+        self.picked_up_at: Optional[float] = None
+        self.arrived_at: Optional[float] = None
+
+class DispatchStrategy(ABC):
+    @abstractmethod
+    def choose(self, controller: "ElevatorController", src: int, dest: int, floors: List[int], directions,
+               candidates: Optional[List[int]] = None) -> int:
+        pass
+
+class NearestCarStrategy(DispatchStrategy):
+    def choose(self, controller: "ElevatorController", src: int, dest: int, floors: List[int], directions,
+               candidates: Optional[List[int]] = None) -> int:
+        return min(candidates or range(len(floors)), key=lambda i: abs(floors[i] - src))
+
+class CollectiveControlStrategy(DispatchStrategy):
+    def __init__(self, reverse_penalty: int = 5, wrong_way_penalty: int = 20):
+        self.reverse_penalty = reverse_penalty
+        self.wrong_way_penalty = wrong_way_penalty
+
+    def choose(self, controller: "ElevatorController", src: int, dest: int, floors: List[int], directions,
+               candidates: Optional[List[int]] = None) -> int:
+        req_down = dest < src
+        idle_score = abs(dest - src)
 
-        elif self.direction == Direction.DOWN:
-            if any(f < self.current_floor for f in self.stops):
-                self.current_floor -= 1
-                print(f"elevator {self.id} moving down to {self.current_floor}")
+        best = 0
+        min_score = float("inf")
+        for i in candidates or range(len(floors)):
+            curr, dir = floors[i], directions[i]
+            if dir == 0:
+                score = idle_score
+            elif dir == 1 and src >= curr:
+                score = src - curr
+            elif dir == -1 and src <= curr:
+                score = curr - src if req_down else curr - src + self.reverse_penalty
             else:
-                self.direction = Direction.UP
-        
+                score = abs(curr - src) + self.wrong_way_penalty
+
+            if score < min_score:
+                min_score = score
+                best = i
+        return best
 
+class DestinationDispatchStrategy(DispatchStrategy):
+    def __init__(self, stop_cost: int = 2, shared_stop_bonus: int = 4):
+        self.stop_cost = stop_cost
+        self.shared_stop_bonus = shared_stop_bonus
+
+    def choose(self, controller: "ElevatorController", src: int, dest: int, floors: List[int], directions,
+               candidates: Optional[List[int]] = None) -> int:
+        req_dir = 1 if dest > src else -1
+        pending = controller.fleet.pending
+
+        best = 0
+        min_score = float("inf")
+        for i in candidates or range(len(floors)):
+            curr, dir = floors[i], directions[i]
+            stops = controller.elevators[i].stops
+            score = abs(curr - src) + self.stop_cost * pending[i]
+            if dir != 0 and (dir != req_dir or (src - curr) * dir < 0):
+                score += 2 * abs(curr - src)
+            if src in stops:
+                score -= self.shared_stop_bonus
+            if dest in stops:
+                score -= self.shared_stop_bonus
+
+            if score < min_score:
+                min_score = score
+                best = i
+        return best
 
-    
 class ElevatorController:
-    def __init__(self, num_elevators: int, capacity: int):
-        self.elevators: List[Elevator] = [Elevator(i, capacity) for i in range(num_elevators)]
+    def __init__(self, num_elevators: int, capacity: int, scheduler: Optional[EventScheduler] = None, verbose: bool = True,
+                 strategy: Optional[DispatchStrategy] = None, batch_window: float = 0.0, retry_delay: float = 5.0):
+        self.scheduler = scheduler or EventScheduler()
+        self.verbose = verbose
+        self.strategy = strategy or CollectiveControlStrategy()
+        self.batch_window = batch_window
+        self.retry_delay = retry_delay
+        self.fleet = FleetState(num_elevators)
+        self.elevators: List[Elevator] = [Elevator(i, capacity, self.scheduler, verbose=verbose, fleet=self.fleet)
+                                          for i in range(num_elevators)]
+
+        self.lock = threading.Lock()
+        self.batch: List[Request] = []
+        self.committed: List[int] = [0] * num_elevators
+        self.waiting: List[Dict[int, List[Request]]] = [{} for _ in range(num_elevators)]
+        self.riding: List[Dict[int, List[Request]]] = [{} for _ in range(num_elevators)]
+        self.completed: List[Request] = []
+        self.max_load = 0
+        for elevator in self.elevators:
+            elevator.on_stop = self.handle_stop
     
     def request_elevator(self, src: int, dest: int):
-        print(f"request from {src} to {dest}")
-        best_elevator = self.find_optimal_elevator(src, dest)
-        best_elevator.add_stop(src)
-        best_elevator.add_stop(dest)
+        if self.verbose:
+            print(f"request from {src} to {dest}")
+        request = Request(src, dest, self.scheduler.now())
+        if self.batch_window <= 0:
+            self.dispatch([request])
+            return
 
-    def find_optimal_elevator(self, src: int, dest: int):
-        best_elevator = None
+        with self.lock:
+            self.batch.append(request)
+            first = len(self.batch) == 1
+        if first:
+            self.scheduler.schedule(self.batch_window, self.flush_batch)
 
-        req_direction = Direction.UP if dest > src else Direction.DOWN
+    def request_elevators(self, requests: List[tuple]):
+        now = self.scheduler.now()
+        for src, dest in requests:
+            if self.verbose:
+                print(f"request from {src} to {dest}")
+        self.dispatch([Request(src, dest, now) for src, dest in requests])
 
-        min_score = float("inf")
-        for elevator in self.elevators:
-            score = float("inf")
+    def flush_batch(self):
+        with self.lock:
+            batch, self.batch = self.batch, []
+        self.dispatch(batch)
+
+    def dispatch(self, requests: List[Request]):
+        floors = self.fleet.current_floors(self.scheduler.now())
+        directions = list(self.fleet.direction)
+
+        groups: Dict[tuple, List[Request]] = {}
+        for request in requests:
+            groups.setdefault((request.src, request.dest > request.src), []).append(request)
+
+        for (src, going_up), riders in groups.items():
+            riders.sort(key=lambda r: r.dest, reverse=not going_up)
+            while riders:
+                free = [elevator.capacity - committed for elevator, committed in zip(self.elevators, self.committed)]
+                candidates = [i for i, room in enumerate(free) if room > 0] or None
+                best = self.strategy.choose(self, src, riders[0].dest, floors, directions, candidates)
+                take = max(1, free[best])
+                self.assign(self.elevators[best], src, riders[:take])
+                riders = riders[take:]
+                directions[best] = self.fleet.direction[best]
+
+    def assign(self, elevator: Elevator, src: int, group: List[Request]):
+        with self.lock:
+            self.waiting[elevator.id].setdefault(src, []).extend(group)
+            self.committed[elevator.id] += len(group)
+        elevator.add_stop(src)
+
+    def handle_stop(self, elevator: Elevator, floor: int):
+        now = self.scheduler.now()
+        with self.lock:
+            arrived = self.riding[elevator.id].pop(floor, [])
+            for request in arrived:
+                request.arrived_at = now
+            self.completed.extend(arrived)
+
+            waiting = self.waiting[elevator.id].pop(floor, [])
+            room = max(0, elevator.capacity - elevator.current_load + len(arrived))
+            boarding, leftover = waiting[:room], waiting[room:]
+            for request in boarding:
+                request.picked_up_at = now
+                self.riding[elevator.id].setdefault(request.dest, []).append(request)
+            self.committed[elevator.id] -= len(arrived) + len(leftover)
 
             with elevator.lock:
-                curr = elevator.current_floor
-                dir = elevator.direction
-
-                if dir == Direction.IDLE:
-                    score = abs(dest - src)
-                elif dir == Direction.UP and src >= curr:
-                    score = src - curr
-                elif dir == Direction.DOWN and src <= curr:
-                    if req_direction == Direction.DOWN:
-                        score = curr - src
-                    else:
-                        score = curr - src + 5
-                else:
-                    score = abs(curr - src) + 20
+                elevator.current_load += len(boarding) - len(arrived)
+                elevator.publish_state()
+            self.max_load = max(self.max_load, elevator.current_load)
 
-            if score < min_score:
-                min_score = score
-                best_elevator = elevator
-        return best_elevator
-    
+        if self.verbose and leftover:
+            print(f"elevator {elevator.id} full at {floor}, {len(leftover)} left waiting")
+        for request in boarding:
+            elevator.add_stop(request.dest)
+        if leftover:
+            self.scheduler.schedule(self.retry_delay, lambda: self.dispatch(leftover))
+
+    def find_optimal_elevator(self, src: int, dest: int):
+        floors = self.fleet.current_floors(self.scheduler.now())
+        return self.elevators[self.strategy.choose(self, src, dest, floors, self.fleet.direction)]
+
+    def get_stats(self, duration: float) -> Dict[str, float]:
+        with self.lock:
+            completed = list(self.completed)
+        waits = sorted(r.picked_up_at - r.requested_at for r in completed)
+        trips = sorted(r.arrived_at - r.picked_up_at for r in completed)
+
+        def p95(values):
+            return values[min(len(values) - 1, int(0.95 * len(values)))] if values else 0.0
+
+        return {
+            "served": len(completed),
+            "avg_wait": sum(waits) / len(waits) if waits else 0.0,
+            "p95_wait": p95(waits),
+            "avg_trip": sum(trips) / len(trips) if trips else 0.0,
+            "p95_trip": p95(trips),
+            "served_per_min": len(completed) / (duration / 60) if duration else 0.0,
+            "max_load": self.max_load,
+        }
+
+def generate_traffic(pattern: str, floors: int, duration: float, rate: float, seed: int = 0) -> List[tuple]:
+    rng = random.Random(seed)
+    traffic = []
+    t = rng.expovariate(rate)
+    while t < duration:
+        if pattern == "up-peak":
+            src, dest = 0, rng.randrange(1, floors)
+        elif pattern == "down-peak":
+            src, dest = rng.randrange(1, floors), 0
+        else:
+            src, dest = rng.sample(range(floors), 2)
+        traffic.append((t, src, dest))
+        t += rng.expovariate(rate)
+    return traffic
+
+def load_traffic(path: str) -> List[tuple]:
+    with open(path, newline="") as f:
+        return [(float(t), int(src), int(dest)) for t, src, dest in csv.reader(f)]
+
+def replay_traffic(num_elevators: int, capacity: int, traffic: List[tuple], strategy: Optional[DispatchStrategy] = None,
+                   duration: Optional[float] = None, batch_window: float = 0.0) -> Dict[str, float]:
+    scheduler = EventScheduler(simulated=True)
+    controller = ElevatorController(num_elevators, capacity, scheduler, verbose=False, strategy=strategy,
+                                    batch_window=batch_window)
+    for t, src, dest in traffic:
+        scheduler.schedule(t, lambda src=src, dest=dest: controller.request_elevator(src, dest))
+
+    scheduler.run()
+    return controller.get_stats(max(duration or 0.0, scheduler.now()))
 
 def demo():
     controller = ElevatorController(2, 10)
@@ -112,6 +454,28 @@ def demo():
     controller.request_elevator(0, 5)
     time.sleep(5)
     controller.request_elevator(1, 6)
+    time.sleep(10)
+
+    print("--- simulated time ---")
+    sim = ElevatorController(2, 10, EventScheduler(simulated=True))
+    sim.request_elevator(0, 5)
+    sim.scheduler.run_until(5)
+    sim.request_elevator(1, 6)
+    sim.scheduler.run()
+    print(f"simulation finished at t={sim.scheduler.now():.0f}s")
+
+    print("--- traffic replay ---")
+    traffic = generate_traffic("up-peak", floors=20, duration=600, rate=0.2)
+    for strategy in (NearestCarStrategy(), CollectiveControlStrategy(), DestinationDispatchStrategy()):
+        stats = replay_traffic(4, 10, traffic, strategy)
+        print(f"{type(strategy).__name__}: {', '.join(f'{k}={v:.1f}' for k, v in stats.items())}")
+
+    print("--- lobby batch ---")
+    lobby = ElevatorController(2, 4, EventScheduler(simulated=True), batch_window=2.0)
+    for dest in (3, 7, 3, 5, 7, 3):
+        lobby.request_elevator(0, dest)
+    lobby.scheduler.run()
+    print(f"served {lobby.get_stats(lobby.scheduler.now())['served']} riders, max load {lobby.max_load}")
 
 if __name__ == "__main__":
     demo()
\ No newline at end of file
@@ -0,0 +1,138 @@
+import contextlib
+import os
+import tempfile
+import threading
+import time
+
+from main import Logger, LoggerConfig, LogLevel, LogAppender, ConsoleAppender, FileAppender, FsyncPolicy, BinaryAppender, LogMessage, DedupFilter
+
+class CountingAppender(LogAppender):
+    def __init__(self):
+        self.count = 0
+
+    def append_log(self, log: LogMessage):
+        self.count += 1
+
+    def append_logs(self, logs):
+        self.count += len(logs)
+
+NUM_THREADS = 8
+MSGS_PER_THREAD = 20000
+
+def run(appender: LogAppender) -> float:
+    logger = Logger()
+    config = LoggerConfig(min_level=LogLevel.INFO)
+    config.add_appender(appender)
+    logger.set_config(config)
+
+    def worker(n: int):
+        for i in range(MSGS_PER_THREAD):
+            logger.info("benchmark message %d from thread %d", i, n)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(NUM_THREADS)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if isinstance(appender, FileAppender):
+        appender.close()
+    elapsed = time.perf_counter() - start
+    return NUM_THREADS * MSGS_PER_THREAD / elapsed
+
+def benchmark_appenders():
+    with tempfile.TemporaryDirectory() as log_dir:
+        with open(os.path.join(log_dir, "console.log"), "w") as out, contextlib.redirect_stdout(out):
+            console_rate = run(ConsoleAppender())
+        print(f"ConsoleAppender (stdout -> file): {console_rate:>12,.0f} msgs/sec")
+
+        for policy in FsyncPolicy:
+            appender = FileAppender(os.path.join(log_dir, f"{policy.name.lower()}.log"), fsync_policy=policy)
+            rate = run(appender)
+            print(f"FileAppender (fsync {policy.name}): {rate:>12,.0f} msgs/sec")
+
+def benchmark_encoding(num_logs: int = 200000):
+    logs = [LogMessage("cache lookup key=%s hit=%s took %.3f ms", LogLevel.DEBUG, (f"user:{i}", i % 3 == 0, i / 7))
+            for i in range(num_logs)]
+
+    with tempfile.TemporaryDirectory() as log_dir:
+        for name, appender in (("text", FileAppender(os.path.join(log_dir, "app.log"))),
+                               ("binary", BinaryAppender(os.path.join(log_dir, "app.blog")))):
+            start = time.perf_counter()
+            appender.append_logs(logs)
+            appender.close()
+            elapsed = time.perf_counter() - start
+            size = os.path.getsize(appender.path)
+            print(f"{name:>6}: {num_logs / elapsed:>12,.0f} msgs/sec, {size / num_logs:6.1f} bytes/msg")
+
+def benchmark_contention(total_msgs: int = 256000):
+    logger = Logger()
+    modes = {
+        "sync": lambda: None,
+        "async queue": logger.enable_async,
+        "thread buffers": logger.enable_thread_buffers,
+    }
+
+    for num_threads in (1, 4, 16, 64):
+        per_thread = total_msgs // num_threads
+        results = []
+        for name, enable in modes.items():
+            appender = CountingAppender()
+            config = LoggerConfig(min_level=LogLevel.INFO)
+            config.add_appender(appender)
+            logger.set_config(config)
+            enable()
+
+            stop = threading.Event()
+
+            def reconfigure():
+                while not stop.wait(0.001):
+                    config.set_level(LogLevel.INFO)
+
+            def worker(n: int):
+                for i in range(per_thread):
+                    logger.info("contention message %d from thread %d", i, n)
+
+            threads = [threading.Thread(target=worker, args=(n,)) for n in range(num_threads)]
+            churn = threading.Thread(target=reconfigure)
+            churn.start()
+            start = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            logger.shutdown()
+            elapsed = time.perf_counter() - start
+            stop.set()
+            churn.join()
+
+            assert appender.count == per_thread * num_threads
+            results.append(f"{name}: {per_thread * num_threads / elapsed:>10,.0f}")
+        print(f"{num_threads:>3} threads | " + " | ".join(results) + " msgs/sec")
+
+def benchmark_dedup(live_keys: int = 20000, calls: int = 200000):
+    dedup = DedupFilter(window=60.0)
+    site = ("benchmark.py", 1)
+    start = time.perf_counter()
+    for i in range(calls):
+        dedup.allow(site, time.monotonic_ns(), "request %d", (i % live_keys,))
+    elapsed = time.perf_counter() - start
+    print(f"DedupFilter, {live_keys} live keys: {elapsed / calls * 1e6:.2f}us per call")
+
+    dedup = DedupFilter(window=60.0)
+    for i in range(1000):
+        user = i % 10
+        dedup.allow(site, time.monotonic_ns(), lambda: f"login failed for user {user}", ())
+    suppressed = sum(dedup.take_suppressed().values())
+    assert suppressed == 990, f"lazy messages: suppressed {suppressed} of 990 repeats"
+    print(f"DedupFilter, lazy messages: suppressed {suppressed} of 1000 (10 distinct)")
+
+if __name__ == "__main__":
+    print(f"{NUM_THREADS} writer threads x {MSGS_PER_THREAD} messages")
+    benchmark_appenders()
+    print("single batch encoding")
+    benchmark_encoding()
+    print("config reads under contention (config rewritten every 1 ms)")
+    benchmark_contention()
+    print("dedup filter")
+    benchmark_dedup()
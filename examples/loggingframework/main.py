@@ -1,9 +1,18 @@
-from enum import IntEnum
+from enum import Enum, IntEnum
 import time
 from datetime import datetime
 import threading
-from typing import List
+from typing import List, Optional, Callable, Union, Dict, Iterator
 from abc import ABC, abstractmethod
+from collections import deque, namedtuple
+import heapq
+import atexit
+import os
+import gzip
+import shutil
+import tempfile
+import struct
+import sys
 
 class LogLevel(IntEnum):
     DEBUG = 0
@@ -13,38 +22,631 @@ class LogLevel(IntEnum):
     ERROR = 4
 
 class LogMessage:
-    def __init__(self, msg: str, level: LogLevel):
-        self.msg = msg
+    __slots__ = ("template", "args", "level", "timestamp_ns", "_msg")
+
+    def __init__(self, msg: Union[str, Callable[[], str]], level: LogLevel, args: tuple = ()):
+        self.template = msg
+        self.args = args
         self.level: LogLevel = level
-        self.timestamp = datetime.now()
+        self.timestamp_ns = time.time_ns()
+        self._msg: Optional[str] = None
+
+    @property
+    def msg(self) -> str:
+        if self._msg is None:
+            if callable(self.template):
+                self._msg = str(self.template())
+            elif self.args:
+                self._msg = self.template % self.args
+            else:
+                self._msg = self.template
+        return self._msg
+
+    @property
+    def timestamp(self) -> datetime:
+        return datetime.fromtimestamp(self.timestamp_ns / 1e9)
 
 class LogAppender(ABC):
     @abstractmethod
     def append_log(self, log: LogMessage):
         pass
 
+    def append_logs(self, logs: List[LogMessage]):
+        for log in logs:
+            self.append_log(log)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+
+def format_log(log: LogMessage) -> str:
+    return f'[{log.level.name} -- {log.timestamp} -- {log.msg}]'
 
 class ConsoleAppender(LogAppender):
     def append_log(self, log: LogMessage):
-        print(f'[{log.level.name} -- {log.timestamp} -- {log.msg}]')
+        print(format_log(log))
+
+class FsyncPolicy(Enum):
+    NONE = 1
+    PER_BATCH = 2
+    INTERVAL = 3
+
+class FileAppender(LogAppender):
+    def __init__(self, path: str, buffer_size: int = 1 << 20, flush_interval: float = 1.0,
+                 fsync_policy: FsyncPolicy = FsyncPolicy.NONE, fsync_interval_ms: int = 100,
+                 max_bytes: Optional[int] = None, rotate_interval: Optional[float] = None, compress: bool = True):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.fsync_policy = fsync_policy
+        self.fsync_interval_ns = fsync_interval_ms * 1_000_000
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.compress = compress
+
+        self.buffer: List[bytes] = []
+        self.buffered_bytes = 0
+        self.lock = threading.Lock()
+        self.compressors: List[threading.Thread] = []
+
+        self.open_file()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run_loop, name="file-appender-flusher", daemon=True)
+        self.thread.start()
+
+    def open_file(self):
+        self.file = open(self.path, "ab", buffering=0)
+        self.file_size = self.file.tell()
+        self.opened_at = time.monotonic()
+        self.dirty = False
+        self.last_fsync_ns = time.monotonic_ns()
+
+    def append_log(self, log: LogMessage):
+        self.append_logs([log])
+
+    def append_logs(self, logs: List[LogMessage]):
+        data = "".join(format_log(log) + "\n" for log in logs).encode()
+        with self.lock:
+            self.buffer.append(data)
+            self.buffered_bytes += len(data)
+            if self.buffered_bytes >= self.buffer_size:
+                self.flush_locked()
+            if self.fsync_policy == FsyncPolicy.PER_BATCH:
+                self.flush_locked()
+                self.fsync_locked()
+
+    def flush_locked(self):
+        if self.buffer:
+            data = b"".join(self.buffer)
+            self.buffer.clear()
+            self.buffered_bytes = 0
+            if self.should_rotate(len(data)):
+                self.rotate_locked()
+            self.file.write(data)
+            self.file_size += len(data)
+            self.dirty = True
+
+        if self.fsync_policy == FsyncPolicy.INTERVAL and time.monotonic_ns() - self.last_fsync_ns >= self.fsync_interval_ns:
+            self.fsync_locked()
+
+    def fsync_locked(self):
+        if self.dirty:
+            os.fsync(self.file.fileno())
+            self.dirty = False
+        self.last_fsync_ns = time.monotonic_ns()
+
+    def should_rotate(self, incoming: int) -> bool:
+        if self.max_bytes is not None and self.file_size > 0 and self.file_size + incoming > self.max_bytes:
+            return True
+        if self.rotate_interval is not None and time.monotonic() - self.opened_at >= self.rotate_interval:
+            return self.file_size > 0
+        return False
+
+    def rotate_locked(self):
+        if self.fsync_policy != FsyncPolicy.NONE:
+            self.fsync_locked()
+        self.file.close()
+
+        rotated = f"{self.path}.{time.strftime('%Y%m%d-%H%M%S')}.{time.time_ns() % 1_000_000_000:09d}"
+        os.rename(self.path, rotated)
+        self.open_file()
+
+        if self.compress:
+            t = threading.Thread(target=self.compress_file, args=(rotated,), name="file-appender-compress", daemon=True)
+            self.compressors = [c for c in self.compressors if c.is_alive()]
+            self.compressors.append(t)
+            t.start()
+
+    def compress_file(self, path: str):
+        try:
+            with open(path, "rb") as src, gzip.open(path + ".gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(path)
+        except OSError as e:
+            print(f"failed to compress {path}: {e}")
+
+    def run_loop(self):
+        interval = self.flush_interval
+        if self.fsync_policy == FsyncPolicy.INTERVAL:
+            interval = min(interval, self.fsync_interval_ns / 1e9)
+        while not self.stopped.wait(interval):
+            with self.lock:
+                self.flush_locked()
+                if self.rotate_interval is not None and self.should_rotate(0):
+                    self.rotate_locked()
+
+    def flush(self):
+        with self.lock:
+            self.flush_locked()
+            if self.fsync_policy != FsyncPolicy.NONE:
+                self.fsync_locked()
+
+    def close(self):
+        if self.stopped.is_set():
+            return
+        self.stopped.set()
+        self.thread.join()
+        with self.lock:
+            self.flush_locked()
+            if self.fsync_policy != FsyncPolicy.NONE:
+                self.fsync_locked()
+            self.file.close()
+        for t in self.compressors:
+            t.join()
     
+BINARY_MAGIC = b"LLOG\x01"
+RECORD_HEADER = struct.Struct("<BBqII")
+TEMPLATE_RECORD = 0
+LOG_RECORD = 1
+INT64 = struct.Struct("<q")
+FLOAT64 = struct.Struct("<d")
+UINT32 = struct.Struct("<I")
+
+def pack_args(args: tuple) -> Optional[bytes]:
+    out = []
+    for arg in args:
+        if arg is None:
+            out.append(b"n")
+        elif arg is True or arg is False:
+            out.append(b"t" if arg else b"f")
+        elif type(arg) is int and -(1 << 63) <= arg < (1 << 63):
+            out.append(b"i" + INT64.pack(arg))
+        elif type(arg) is float:
+            out.append(b"d" + FLOAT64.pack(arg))
+        elif type(arg) is str:
+            data = arg.encode()
+            out.append(b"s" + UINT32.pack(len(data)) + data)
+        else:
+            return None
+    return b"".join(out)
+
+def unpack_args(data: bytes) -> tuple:
+    args = []
+    pos = 0
+    while pos < len(data):
+        tag = data[pos:pos + 1]
+        pos += 1
+        if tag == b"n":
+            args.append(None)
+        elif tag == b"t" or tag == b"f":
+            args.append(tag == b"t")
+        elif tag == b"i":
+            args.append(INT64.unpack_from(data, pos)[0])
+            pos += INT64.size
+        elif tag == b"d":
+            args.append(FLOAT64.unpack_from(data, pos)[0])
+            pos += FLOAT64.size
+        elif tag == b"s":
+            (length,) = UINT32.unpack_from(data, pos)
+            pos += UINT32.size
+            args.append(data[pos:pos + length].decode())
+            pos += length
+        else:
+            raise ValueError(f"unknown arg tag {tag!r}")
+    return tuple(args)
+
+class BinaryAppender(LogAppender):
+    def __init__(self, path: str):
+        self.path = path
+        self.templates: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            for template_id, template in read_binary_templates(path):
+                self.templates[template] = template_id
+            self.file = open(path, "ab")
+        else:
+            self.file = open(path, "wb")
+            self.file.write(BINARY_MAGIC)
+
+    def encode(self, log: LogMessage, out: List[bytes]):
+        template = log.template
+        payload = None
+        if type(template) is str:
+            payload = pack_args(log.args)
+        if payload is None:
+            template = "%s"
+            payload = pack_args((log.msg,))
+
+        template_id = self.templates.get(template)
+        if template_id is None:
+            template_id = len(self.templates)
+            self.templates[template] = template_id
+            data = template.encode()
+            out.append(RECORD_HEADER.pack(TEMPLATE_RECORD, 0, 0, template_id, len(data)))
+            out.append(data)
+
+        out.append(RECORD_HEADER.pack(LOG_RECORD, log.level, log.timestamp_ns, template_id, len(payload)))
+        out.append(payload)
+
+    def append_log(self, log: LogMessage):
+        self.append_logs([log])
+
+    def append_logs(self, logs: List[LogMessage]):
+        with self.lock:
+            out: List[bytes] = []
+            for log in logs:
+                self.encode(log, out)
+            self.file.write(b"".join(out))
+
+    def flush(self):
+        with self.lock:
+            if not self.file.closed:
+                self.file.flush()
+
+    def close(self):
+        with self.lock:
+            if not self.file.closed:
+                self.file.close()
+
+def iter_binary_records(f):
+    if f.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+        raise ValueError("not a binary log file")
+    while True:
+        header = f.read(RECORD_HEADER.size)
+        if len(header) < RECORD_HEADER.size:
+            return
+        yield RECORD_HEADER.unpack(header)
+
+def read_binary_templates(path: str) -> Iterator[tuple]:
+    with open(path, "rb") as f:
+        for kind, _, _, template_id, length in iter_binary_records(f):
+            if kind == TEMPLATE_RECORD:
+                yield template_id, f.read(length).decode()
+            else:
+                f.seek(length, os.SEEK_CUR)
+
+def read_binary_log(path: str, min_level: LogLevel = LogLevel.DEBUG,
+                    start_ns: Optional[int] = None, end_ns: Optional[int] = None) -> Iterator[LogMessage]:
+    templates: Dict[int, str] = {}
+    with open(path, "rb") as f:
+        for kind, level, timestamp_ns, template_id, length in iter_binary_records(f):
+            if kind == TEMPLATE_RECORD:
+                templates[template_id] = f.read(length).decode()
+                continue
+            if (level < min_level
+                    or (start_ns is not None and timestamp_ns < start_ns)
+                    or (end_ns is not None and timestamp_ns >= end_ns)):
+                f.seek(length, os.SEEK_CUR)
+                continue
+
+            log = LogMessage(templates[template_id], LogLevel(level), unpack_args(f.read(length)))
+            log.timestamp_ns = timestamp_ns
+            yield log
+
+class LogFilter(ABC):
+    def __init__(self):
+        self.suppressed: Dict[tuple, int] = {}
+
+    @abstractmethod
+    def allow(self, site: tuple, now_ns: int, msg, args: tuple) -> bool:
+        pass
+
+    def suppress(self, site: tuple) -> bool:
+        self.suppressed[site] = self.suppressed.get(site, 0) + 1
+        return False
+
+    def take_suppressed(self) -> Dict[tuple, int]:
+        suppressed, self.suppressed = self.suppressed, {}
+        return suppressed
+
+class RateLimitFilter(LogFilter):
+    def __init__(self, rate: float, burst: int = 1):
+        super().__init__()
+        self.rate_per_ns = rate / 1e9
+        self.burst = burst
+        self.buckets: Dict[tuple, list] = {}
+
+    def allow(self, site: tuple, now_ns: int, msg, args: tuple) -> bool:
+        bucket = self.buckets.get(site)
+        if bucket is None:
+            bucket = self.buckets[site] = [float(self.burst), now_ns]
+
+        tokens = min(self.burst, bucket[0] + (now_ns - bucket[1]) * self.rate_per_ns)
+        bucket[1] = now_ns
+        if tokens < 1:
+            bucket[0] = tokens
+            return self.suppress(site)
+        bucket[0] = tokens - 1
+        return True
+
+class SamplingFilter(LogFilter):
+    def __init__(self, n: int):
+        super().__init__()
+        self.n = n
+        self.counts: Dict[tuple, int] = {}
+
+    def allow(self, site: tuple, now_ns: int, msg, args: tuple) -> bool:
+        count = self.counts.get(site, 0)
+        self.counts[site] = count + 1
+        if count % self.n:
+            return self.suppress(site)
+        return True
+
+def lazy_message_key(msg) -> tuple:
+    code = getattr(msg, "__code__", None)
+    if code is None:
+        return (msg,)
+    cells = msg.__closure__ or ()
+    return (code, msg.__defaults__) + tuple(cell.cell_contents for cell in cells)
+
+class DedupFilter(LogFilter):
+    def __init__(self, window: float, min_prune: int = 10000):
+        super().__init__()
+        self.window_ns = int(window * 1e9)
+        self.last_seen: Dict[tuple, int] = {}
+        self.min_prune = min_prune
+        self.prune_at = min_prune
+
+    def allow(self, site: tuple, now_ns: int, msg, args: tuple) -> bool:
+        try:
+            key = (site, lazy_message_key(msg) if callable(msg) else msg, args)
+            last = self.last_seen.get(key)
+        except (TypeError, ValueError):
+            return True
+        if last is not None and now_ns - last < self.window_ns:
+            return self.suppress(site)
+
+        if len(self.last_seen) >= self.prune_at:
+            self.last_seen = {k: t for k, t in self.last_seen.items() if now_ns - t < self.window_ns}
+            self.prune_at = max(self.min_prune, 2 * len(self.last_seen))
+        self.last_seen[key] = now_ns
+        return True
+
+ConfigSnapshot = namedtuple("ConfigSnapshot", ["min_level", "appenders", "enabled", "filters"])
+
+def make_snapshot(min_level: Optional[LogLevel], appenders: tuple, filters: tuple = ()) -> ConfigSnapshot:
+    enabled = tuple(bool(appenders) and min_level is not None and lvl >= min_level for lvl in LogLevel)
+    return ConfigSnapshot(min_level, appenders, enabled, filters)
+
 class LoggerConfig:
-    def __init__(self, min_level: LogLevel = LogLevel.INFO):
-        self.min_level = min_level
-        self.appenders: List[LogAppender] = []
+    def __init__(self, min_level: Optional[LogLevel] = LogLevel.INFO, summary_interval: float = 10.0):
+        self.snapshot = make_snapshot(min_level, ())
+        self.summary_interval = summary_interval
+        self.listeners: List["Logger"] = []
         self.lock = threading.Lock()
 
+    @property
+    def min_level(self) -> Optional[LogLevel]:
+        return self.snapshot.min_level
+
+    @property
+    def appenders(self) -> tuple:
+        return self.snapshot.appenders
+
+    def attach(self, logger: "Logger"):
+        with self.lock:
+            self.listeners.append(logger)
+
+    def detach(self, logger: "Logger"):
+        with self.lock:
+            if logger in self.listeners:
+                self.listeners.remove(logger)
+
+    def update(self, min_level: Optional[LogLevel], appenders: tuple, filters: tuple):
+        self.snapshot = make_snapshot(min_level, appenders, filters)
+        for logger in self.listeners:
+            logger.invalidate()
+
     def add_appender(self, appender: LogAppender):
         with self.lock:
-            self.appenders.append(appender)
+            current = self.snapshot
+            self.update(current.min_level, current.appenders + (appender,), current.filters)
+
+    def add_filter(self, log_filter: LogFilter):
+        with self.lock:
+            current = self.snapshot
+            self.update(current.min_level, current.appenders, current.filters + (log_filter,))
 
-    def set_level(self, level: LogLevel):
+    def set_level(self, level: Optional[LogLevel]):
         with self.lock:
-            self.min_level = level
+            current = self.snapshot
+            self.update(level, current.appenders, current.filters)
+
+    def is_enabled(self, level: LogLevel) -> bool:
+        return self.snapshot.enabled[level]
+
+class OverflowPolicy(Enum):
+    BLOCK = 1
+    DROP_OLDEST = 2
+    DROP_NEWEST = 3
+
+class SubmitResult(Enum):
+    ACCEPTED = 1
+    DROPPED = 2
+    STOPPED = 3
+
+class LogDispatcher(ABC):
+    dropped = 0
+    is_running = True
+
+    @abstractmethod
+    def submit(self, log: LogMessage, appenders: tuple) -> SubmitResult:
+        pass
+
+    @abstractmethod
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        pass
+
+    @abstractmethod
+    def shutdown(self, timeout: Optional[float] = None):
+        pass
+
+    def deliver(self, batch):
+        per_appender = {}
+        for log, appenders in batch:
+            for appender in appenders:
+                per_appender.setdefault(appender, []).append(log)
+
+        for appender, logs in per_appender.items():
+            try:
+                appender.append_logs(logs)
+            except Exception as e:
+                print(f"appender {type(appender).__name__} failed: {e}")
+
+class AsyncLogDispatcher(LogDispatcher):
+    def __init__(self, max_size: int = 10000, batch_size: int = 256, policy: OverflowPolicy = OverflowPolicy.BLOCK):
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.policy = policy
+        self.queue: deque = deque()
+        self.dropped = 0
+        self.in_flight = 0
+        self.is_running = True
+
+        self.lock = threading.Lock()
+        self.not_empty = threading.Condition(self.lock)
+        self.not_full = threading.Condition(self.lock)
+        self.drained = threading.Condition(self.lock)
+
+        self.thread = threading.Thread(target=self.run_loop, name="log-dispatcher", daemon=True)
+        self.thread.start()
+
+    def submit(self, log: LogMessage, appenders: tuple) -> SubmitResult:
+        with self.lock:
+            if not self.is_running:
+                return SubmitResult.STOPPED
+            if len(self.queue) >= self.max_size:
+                if self.policy == OverflowPolicy.DROP_NEWEST:
+                    self.dropped += 1
+                    return SubmitResult.DROPPED
+                elif self.policy == OverflowPolicy.DROP_OLDEST:
+                    self.queue.popleft()
+                    self.dropped += 1
+                else:
+                    while len(self.queue) >= self.max_size and self.is_running:
+                        self.not_full.wait()
+                    if not self.is_running:
+                        return SubmitResult.STOPPED
+            self.queue.append((log, appenders))
+            self.not_empty.notify()
+            return SubmitResult.ACCEPTED
+
+    def run_loop(self):
+        while True:
+            with self.lock:
+                while not self.queue and self.is_running:
+                    self.not_empty.wait()
+                if not self.queue:
+                    return
+                batch = [self.queue.popleft() for _ in range(min(self.batch_size, len(self.queue)))]
+                self.in_flight = len(batch)
+                self.not_full.notify_all()
+
+            self.deliver(batch)
+
+            with self.lock:
+                self.in_flight = 0
+                if not self.queue:
+                    self.drained.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        with self.lock:
+            return self.drained.wait_for(lambda: not self.queue and self.in_flight == 0, timeout)
+
+    def shutdown(self, timeout: Optional[float] = None):
+        with self.lock:
+            self.is_running = False
+            self.not_empty.notify_all()
+            self.not_full.notify_all()
+        self.thread.join(timeout)
+
+class ThreadBufferedDispatcher(LogDispatcher):
+    def __init__(self, flush_interval: float = 0.05, max_buffer: int = 1024):
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.local = threading.local()
+        self.buffers: List[tuple] = []
+        self.is_running = True
+
+        self.register_lock = threading.Lock()
+        self.drain_lock = threading.Lock()
+        self.wake = threading.Event()
+        self.thread = threading.Thread(target=self.run_loop, name="log-buffer-flusher", daemon=True)
+        self.thread.start()
+
+    def submit(self, log: LogMessage, appenders: tuple) -> SubmitResult:
+        if not self.is_running:
+            return SubmitResult.STOPPED
+        buffer = getattr(self.local, "buffer", None)
+        if buffer is None:
+            buffer = self.local.buffer = []
+            with self.register_lock:
+                self.buffers.append((threading.current_thread(), buffer))
+
+        buffer.append((log, appenders))
+        if len(buffer) >= self.max_buffer:
+            if len(buffer) >= 4 * self.max_buffer:
+                self.drain()
+            else:
+                self.wake.set()
+        return SubmitResult.ACCEPTED
+
+    def run_loop(self):
+        while self.is_running:
+            self.wake.wait(self.flush_interval)
+            self.wake.clear()
+            self.drain()
+
+    def drain(self):
+        with self.drain_lock:
+            with self.register_lock:
+                buffers = list(self.buffers)
+
+            chunks = []
+            for _, buffer in buffers:
+                n = len(buffer)
+                if n:
+                    chunks.append(buffer[:n])
+                    del buffer[:n]
+
+            if chunks:
+                if len(chunks) == 1:
+                    batch = chunks[0]
+                else:
+                    batch = list(heapq.merge(*chunks, key=lambda item: item[0].timestamp_ns))
+                self.deliver(batch)
+
+            with self.register_lock:
+                self.buffers = [(t, b) for t, b in self.buffers if b or t.is_alive()]
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        self.drain()
+        return True
+
+    def shutdown(self, timeout: Optional[float] = None):
+        self.is_running = False
+        self.wake.set()
+        self.thread.join(timeout)
+        self.drain()
 
 class Logger:
     instance = None
     lock = threading.Lock()
+    generation = 0
 
     def __new__(cls):
         if cls.instance is None:
@@ -55,24 +657,178 @@ class Logger:
         return cls.instance
     
     def initialize(self):
+        self.name = ""
+        self.parent: Optional[Logger] = None
+        self.root = self
+        self.children: List[Logger] = []
+        self.registry: Dict[str, Logger] = {}
+        self.effective: Optional[ConfigSnapshot] = None
         self.config = LoggerConfig()
+        self.config.attach(self)
+        self.dispatcher: Optional[LogDispatcher] = None
+        self.next_summary_ns = 0
+        atexit.register(self.shutdown)
+
+    def initialize_child(self, name: str, parent: "Logger"):
+        self.name = name
+        self.parent = parent
+        self.root = parent.root
+        self.children = []
+        self.effective = None
+        self.config: Optional[LoggerConfig] = None
+        self.next_summary_ns = 0
+
+    @classmethod
+    def get(cls, name: str = "") -> "Logger":
+        root = cls()
+        if not name:
+            return root
+
+        with cls.lock:
+            logger = root.registry.get(name)
+            if logger is None:
+                parent = root
+                parts = name.split(".")
+                for i in range(len(parts)):
+                    path = ".".join(parts[:i + 1])
+                    logger = root.registry.get(path)
+                    if logger is None:
+                        logger = super(Logger, cls).__new__(cls)
+                        logger.initialize_child(path, parent)
+                        parent.children.append(logger)
+                        root.registry[path] = logger
+                    parent = logger
+            return logger
+
+    def invalidate(self):
+        with Logger.lock:
+            Logger.generation += 1
+            stack = [self]
+            while stack:
+                logger = stack.pop()
+                logger.effective = None
+                stack.extend(logger.children)
+
+    def resolve(self) -> ConfigSnapshot:
+        generation = Logger.generation
+        own = self.config.snapshot if self.config else None
+        if self.parent is None:
+            snapshot = own
+        else:
+            inherited = self.parent.effective or self.parent.resolve()
+            if own is None:
+                snapshot = inherited
+            else:
+                min_level = own.min_level if own.min_level is not None else inherited.min_level
+                snapshot = make_snapshot(min_level, own.appenders + inherited.appenders, own.filters + inherited.filters)
+
+        with Logger.lock:
+            if generation == Logger.generation:
+                self.effective = snapshot
+        return snapshot
 
     def set_config(self, config: LoggerConfig):
+        if self.config:
+            self.config.detach(self)
+        self.config = config
+        config.attach(self)
+        self.invalidate()
+
+    def ensure_config(self) -> LoggerConfig:
+        if self.config is None:
+            self.set_config(LoggerConfig(min_level=None))
+        return self.config
+
+    def set_level(self, level: Optional[LogLevel]):
+        self.ensure_config().set_level(level)
+
+    def add_appender(self, appender: LogAppender):
+        self.ensure_config().add_appender(appender)
+
+    def enable_async(self, max_size: int = 10000, batch_size: int = 256, policy: OverflowPolicy = OverflowPolicy.BLOCK):
+        root = self.root
+        with self.lock:
+            if root.dispatcher is None or not root.dispatcher.is_running:
+                root.dispatcher = AsyncLogDispatcher(max_size, batch_size, policy)
+        return root.dispatcher
+
+    def enable_thread_buffers(self, flush_interval: float = 0.05, max_buffer: int = 1024):
+        root = self.root
         with self.lock:
-            self.config = config
-        
-    def log(self, level: LogLevel, msg: str):
-        if level >= self.config.min_level:
-            log_msg = LogMessage(msg, level)
+            if root.dispatcher is None or not root.dispatcher.is_running:
+                root.dispatcher = ThreadBufferedDispatcher(flush_interval, max_buffer)
+        return root.dispatcher
+
+    def dropped_count(self) -> int:
+        dispatcher = self.root.dispatcher
+        return dispatcher.dropped if dispatcher else 0
+
+    def all_appenders(self) -> List[LogAppender]:
+        root = self.root
+        with Logger.lock:
+            configs = [root.config] + [logger.config for logger in root.registry.values() if logger.config]
+        appenders = []
+        for config in configs:
+            for appender in config.appenders:
+                if appender not in appenders:
+                    appenders.append(appender)
+        return appenders
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        self.emit_summary(self.effective or self.resolve())
+        dispatcher = self.root.dispatcher
+        drained = dispatcher.flush(timeout) if dispatcher else True
+        for appender in self.all_appenders():
+            appender.flush()
+        return drained
+
+    def shutdown(self, timeout: Optional[float] = None):
+        dispatcher = self.root.dispatcher
+        if dispatcher:
+            dispatcher.shutdown(timeout)
+        for appender in self.all_appenders():
+            appender.close()
+
+    def emit_summary(self, snapshot: ConfigSnapshot):
+        for log_filter in snapshot.filters:
+            for (filename, lineno), count in log_filter.take_suppressed().items():
+                self.emit(snapshot, LogMessage("suppressed %d messages from %s:%d (%s)", LogLevel.WARNING,
+                                               (count, filename, lineno, type(log_filter).__name__)))
+
+    def emit(self, snapshot: ConfigSnapshot, log_msg: LogMessage):
+        dispatcher = self.root.dispatcher
+        if dispatcher and dispatcher.submit(log_msg, snapshot.appenders) != SubmitResult.STOPPED:
+            return
 
-            for appender in self.config.appenders:
-                appender.append_log(log_msg)
+        for appender in snapshot.appenders:
+            appender.append_log(log_msg)
+
+    def dispatch(self, level: LogLevel, msg, args: tuple, depth: int):
+        snapshot = self.effective or self.resolve()
+        if not snapshot.enabled[level]:
+            return
+
+        if snapshot.filters:
+            frame = sys._getframe(depth)
+            site = (frame.f_code.co_filename, frame.f_lineno)
+            now_ns = time.monotonic_ns()
+            if now_ns >= self.next_summary_ns:
+                self.next_summary_ns = now_ns + int(self.root.config.summary_interval * 1e9)
+                self.emit_summary(snapshot)
+            for log_filter in snapshot.filters:
+                if not log_filter.allow(site, now_ns, msg, args):
+                    return
+
+        self.emit(snapshot, LogMessage(msg, level, args))
+
+    def log(self, level: LogLevel, msg: Union[str, Callable[[], str]], *args):
+        self.dispatch(level, msg, args, 2)
     
-    def info(self, msg: str):
-        self.log(LogLevel.INFO, msg)
+    def info(self, msg: Union[str, Callable[[], str]], *args):
+        self.dispatch(LogLevel.INFO, msg, args, 2)
 
-    def debug(self, msg: str):
-        self.log(LogLevel.DEBUG, msg)
+    def debug(self, msg: Union[str, Callable[[], str]], *args):
+        self.dispatch(LogLevel.DEBUG, msg, args, 2)
 
 
 def demo():
@@ -85,6 +841,70 @@ def demo():
 
     logger.info("Hello world!")
     logger.debug("debug log")
-    
+    logger.info("%d appenders configured", len(config.appenders))
+    logger.debug(lambda: f"expensive state dump {list(range(1000))}")
+
+    filter_config = LoggerConfig(min_level=LogLevel.INFO, summary_interval=0.05)
+    filter_config.add_appender(ConsoleAppender())
+    filter_config.add_filter(SamplingFilter(10))
+    filter_config.add_filter(RateLimitFilter(rate=100, burst=2))
+    logger.set_config(filter_config)
+
+    for i in range(100):
+        logger.info("hot path iteration %d", i)
+    time.sleep(0.06)
+    logger.flush()
+    logger.set_config(config)
+
+    payments = Logger.get("payments")
+    gateway = Logger.get("payments.gateway")
+    gateway.debug("not shown, gateway inherits INFO from the root")
+    payments.set_level(LogLevel.DEBUG)
+    gateway.debug("shown, payments subtree is now at DEBUG")
+    Logger.get("orders").debug("not shown, orders still inherits INFO")
+
+    logger.enable_async(max_size=100, policy=OverflowPolicy.DROP_OLDEST)
+
+    def worker(n: int):
+        for i in range(50):
+            logger.info("async log %d from worker %d", i, n)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    logger.shutdown()
+    print(f"dropped {logger.dropped_count()} logs")
+
+    log_dir = tempfile.mkdtemp()
+    file_appender = FileAppender(os.path.join(log_dir, "app.log"), buffer_size=1024, fsync_policy=FsyncPolicy.INTERVAL, max_bytes=4096)
+    file_config = LoggerConfig(min_level=LogLevel.INFO)
+    file_config.add_appender(file_appender)
+    logger.set_config(file_config)
+
+    for i in range(200):
+        logger.info("file log %d", i)
+    file_appender.close()
+    time.sleep(0.1)
+    print(f"log files in {log_dir}: {sorted(os.listdir(log_dir))}")
+
+    binary_path = os.path.join(log_dir, "app.blog")
+    binary_appender = BinaryAppender(binary_path)
+    binary_config = LoggerConfig(min_level=LogLevel.DEBUG)
+    binary_config.add_appender(binary_appender)
+    logger.set_config(binary_config)
+
+    for i in range(1000):
+        logger.debug("cache lookup key=%s hit=%s took %.3f ms", f"user:{i}", i % 3 == 0, i / 7)
+        if i % 250 == 0:
+            logger.info("processed %d requests", i)
+    binary_appender.close()
+
+    print(f"binary log is {os.path.getsize(binary_path)} bytes")
+    for log in read_binary_log(binary_path, min_level=LogLevel.INFO):
+        print(format_log(log))
+
 if __name__ == "__main__":
     demo()
\ No newline at end of file
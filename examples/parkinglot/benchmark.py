@@ -0,0 +1,257 @@
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from main import ParkingLot, Level, Car, Truck
+
+LEVELS = 5
+SPOTS_PER_LEVEL = 10_000
+CHURN_OPS = 50_000
+
+GATE_CYCLES = 20_000
+GATE_DELAY = 0.0002
+
+RECOVERY_LEVELS = 10
+FILL_OPS = 80_000
+SYNC_EVERY = 1_000
+CRASH_AFTER = 150_000
+RECOVERY_BUDGET = 1.0
+
+def build_lot(stripes: int = 8) -> ParkingLot:
+    random.seed(42)
+    lot = ParkingLot()
+    lot.reset()
+    lot.verbose = False
+    for _ in range(LEVELS):
+        lot.add_level(SPOTS_PER_LEVEL, stripes)
+    return lot
+
+def benchmark_fill_and_churn():
+    lot = build_lot()
+    rng = random.Random(7)
+    vehicles = [Car(f"car-{i}") if rng.random() < 0.5 else Truck(f"truck-{i}") for i in range(LEVELS * SPOTS_PER_LEVEL)]
+
+    start = time.perf_counter()
+    parked = [v for v in vehicles if lot.park_vehicle(v)]
+    elapsed = time.perf_counter() - start
+    print(f"fill: {len(parked)} of {LEVELS * SPOTS_PER_LEVEL} spots, {elapsed / len(vehicles) * 1e6:.1f}us per park")
+
+    start = time.perf_counter()
+    for i in range(CHURN_OPS):
+        leaving = parked.pop(rng.randrange(len(parked)))
+        lot.unpark_vehicle(leaving)
+        arriving = type(leaving)(f"churn-{i}")
+        if lot.park_vehicle(arriving):
+            parked.append(arriving)
+    elapsed = time.perf_counter() - start
+    print(f"churn: {CHURN_OPS} unpark+park pairs, {elapsed / CHURN_OPS * 1e6:.1f}us per pair")
+
+    start = time.perf_counter()
+    for vehicle in parked[:10_000]:
+        lot.find_vehicle(vehicle.name)
+    print(f"find_vehicle: {(time.perf_counter() - start) / 10_000 * 1e6:.2f}us per lookup")
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        lot.get_availability()
+    print(f"get_availability: {(time.perf_counter() - start) / 1000 * 1e6:.1f}us")
+
+def run_gates(lot: ParkingLot, gates: int, gate_delay: float) -> float:
+    cycles = GATE_CYCLES // gates
+
+    def gate_worker(gate: int):
+        vehicles = [Car(f"gate-{gate}-{i}") for i in range(8)]
+        for i in range(cycles):
+            vehicle = vehicles[i % len(vehicles)]
+            lot.park_vehicle(vehicle, gate)
+            if gate_delay:
+                spot = lot.find_vehicle(vehicle.name)
+                level = spot.level
+                with level.stripe_locks[spot.spot_type][spot.index // level.segment_size]:
+                    time.sleep(gate_delay)
+            lot.unpark_vehicle(vehicle)
+
+    threads = [threading.Thread(target=gate_worker, args=(gate,)) for gate in range(gates)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return cycles * gates / (time.perf_counter() - start)
+
+def benchmark_gates():
+    for gate_delay in (0.0, GATE_DELAY):
+        print(f"gate throughput, {gate_delay * 1e6:.0f}us of gate I/O per vehicle under the spot's stripe lock")
+        for stripes in (1, 8):
+            lot = build_lot(stripes)
+            rates = [run_gates(lot, gates, gate_delay) for gates in (1, 2, 4, 8)]
+            print(f"  {stripes} stripe(s): " + "  ".join(f"{g} gates {r:8.0f}/s" for g, r in zip((1, 2, 4, 8), rates)))
+
+def benchmark_level_memory(num_spots: int = 1_000_000):
+    start = time.perf_counter()
+    Level(1, num_spots)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    level = Level(1, num_spots)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"level of {num_spots} spots: built in {elapsed:.2f}s, {current / num_spots:.1f} bytes per spot")
+    return level
+
+def workload(lot: ParkingLot):
+    rng = random.Random(7)
+    parked = []
+    i = 0
+    while True:
+        if i >= FILL_OPS and parked and rng.random() < 0.5:
+            j = rng.randrange(len(parked))
+            parked[j], parked[-1] = parked[-1], parked[j]
+            vehicle = parked.pop()
+            lot.unpark_vehicle(vehicle)
+        else:
+            vehicle = (Car if rng.random() < 0.5 else Truck)(f"v{i}")
+            if lot.park_vehicle(vehicle):
+                parked.append(vehicle)
+        i += 1
+        yield i, vehicle.name
+
+def open_recovery_lot(directory: str) -> ParkingLot:
+    random.seed(42)
+    lot = ParkingLot()
+    lot.verbose = False
+    lot.open_journal(directory, snapshot_every=100_000)
+    if not lot.levels:
+        for _ in range(RECOVERY_LEVELS):
+            lot.add_level(SPOTS_PER_LEVEL)
+    return lot
+
+def crash_workload(directory: str):
+    lot = open_recovery_lot(directory)
+    for i, _ in workload(lot):
+        if i % SYNC_EVERY == 0:
+            lot.journal.sync()
+            print(i, flush=True)
+
+def spot_of(lot: ParkingLot, name: str):
+    spot = lot.find_vehicle(name)
+    return spot.spot_id if spot else None
+
+def check_checkpoint_during_unpark():
+    for checkpoint_first in (True, False):
+        directory = tempfile.mkdtemp(prefix="parking-journal-")
+        lot = ParkingLot()
+        lot.reset()
+        lot.verbose = False
+        lot.open_journal(directory)
+        lot.add_level(10)
+        car = Car("racer")
+        while not lot.park_vehicle(car):
+            car = Truck("racer")
+        level = lot.levels[0]
+        unpark_spot = level.unpark_spot
+
+        def unpark_with_checkpoint(spot):
+            if checkpoint_first:
+                lot.checkpoint()
+            freed = unpark_spot(spot)
+            if not checkpoint_first:
+                lot.checkpoint()
+            return freed
+
+        level.unpark_spot = unpark_with_checkpoint
+        lot.unpark_vehicle(car)
+        lot.journal.sync()
+        lot.journal.stopped.set()
+
+        lot.reset()
+        lot.verbose = False
+        lot.open_journal(directory)
+        assert lot.find_vehicle("racer") is None, "checkpoint during unpark brought the car back"
+        lot.close_journal()
+        lot.reset()
+    print("checkpoint during unpark: recovered lot has no ghost car")
+
+def check_park_on_new_level():
+    directory = tempfile.mkdtemp(prefix="parking-journal-")
+    lot = ParkingLot()
+    lot.reset()
+    lot.verbose = False
+    lot.open_journal(directory)
+    open_level = lot.open_level
+
+    def open_and_park(level):
+        open_level(level)
+        for vehicle in (Car("early-bird"), Truck("early-bird")):
+            if lot.park_vehicle(vehicle):
+                break
+
+    lot.open_level = open_and_park
+    lot.add_level(10)
+    lot.journal.sync()
+    lot.journal.stopped.set()
+
+    lot.reset()
+    lot.verbose = False
+    lot.open_journal(directory)
+    assert lot.find_vehicle("early-bird") is not None, "park on a new level was journaled before the level"
+    lot.close_journal()
+    lot.reset()
+    print("park on a new level: recovered after its level")
+
+def benchmark_recovery():
+    directory = tempfile.mkdtemp(prefix="parking-journal-")
+    child = subprocess.Popen([sys.executable, "-c", f"import benchmark; benchmark.crash_workload({directory!r})"],
+                             cwd=os.path.dirname(os.path.abspath(__file__)), stdout=subprocess.PIPE, text=True)
+    synced = 0
+    for line in child.stdout:
+        synced = int(line)
+        if synced >= CRASH_AFTER:
+            break
+    child.send_signal(signal.SIGKILL)
+    child.wait()
+    print(f"killed writer after {synced} synced ops; files: {sorted(os.listdir(directory))}")
+
+    lot = ParkingLot()
+    lot.verbose = False
+    start = time.perf_counter()
+    lot.open_journal(directory)
+    elapsed = time.perf_counter() - start
+    recovered = {name: spot.spot_id for locations in lot.locations for name, (_, spot) in locations.items()}
+    print(f"recovered {len(recovered)} vehicles on {len(lot.levels) * SPOTS_PER_LEVEL} spots in {elapsed * 1000:.0f}ms")
+    lot.close_journal()
+    assert elapsed < RECOVERY_BUDGET, f"recovery took {elapsed:.2f}s, budget is {RECOVERY_BUDGET}s"
+
+    random.seed(42)
+    lot.reset()
+    lot.verbose = False
+    for _ in range(RECOVERY_LEVELS):
+        lot.add_level(SPOTS_PER_LEVEL)
+    mismatched = None
+    for i, name in workload(lot):
+        if i == synced:
+            names = set(recovered) | {n for locations in lot.locations for n in locations}
+            mismatched = {n for n in names if spot_of(lot, n) != recovered.get(n)}
+        elif mismatched is not None:
+            if spot_of(lot, name) != recovered.get(name):
+                mismatched.add(name)
+            else:
+                mismatched.discard(name)
+        if mismatched is not None and not mismatched:
+            print(f"recovered state matches the workload after op {i} (synced up to {synced})")
+            return
+        assert i <= synced + 100_000, f"recovered state does not match any prefix after op {synced}"
+
+if __name__ == "__main__":
+    check_checkpoint_during_unpark()
+    check_park_on_new_level()
+    benchmark_recovery()
+    benchmark_level_memory()
+    benchmark_fill_and_churn()
+    benchmark_gates()
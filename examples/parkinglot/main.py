@@ -1,9 +1,16 @@
 from enum import Enum
 from abc import ABC
-from typing import Optional, List
+from typing import Optional, List, Dict, Callable, Tuple
+from array import array
+from collections import deque
+from itertools import compress
 import threading
 import random
+import struct
 import time
+import os
+import shutil
+import tempfile
 
 class VehicleType(Enum):
     CAR = 1
@@ -22,60 +29,294 @@ class Truck(Vehicle):
     def __init__(self, name):
         super().__init__(name, VehicleType.TRUCK)
 
+SPOT_TYPE_TABLE = bytes(VehicleType.CAR.value if b & 1 else VehicleType.TRUCK.value for b in range(256))
+MATCH_TABLES = {vehicle_type: bytes(int(b == vehicle_type.value) for b in range(256)) for vehicle_type in VehicleType}
+
 class ParkingSpot:
-    def __init__(self, spot_id: str, spot_type: VehicleType):
-        self.spot_id = spot_id
-        self.spot_type = spot_type
-        self.parked_vehicle: Optional[Vehicle] = None
+    __slots__ = ("level", "index")
+
+    def __init__(self, level: "Level", index: int):
+        self.level = level
+        self.index = index
+
+    @property
+    def spot_id(self) -> str:
+        return f"L_{self.level.level_number}-{self.index + 1}"
+
+    @property
+    def spot_type(self) -> VehicleType:
+        return VehicleType(self.level.spot_types[self.index])
+
+    @property
+    def parked_vehicle(self) -> Optional[Vehicle]:
+        return self.level.vehicles.get(self.index)
 
     def is_free(self):
-        return self.parked_vehicle is None
+        return not self.level.occupied[self.index]
     
     def park(self, vehicle: Vehicle):
-        if (self.is_free() and self.spot_type == vehicle.vehicle_type):
-            self.parked_vehicle = vehicle
+        if (self.is_free() and self.level.spot_types[self.index] == vehicle.vehicle_type.value):
+            self.level.occupied[self.index] = 1
+            self.level.vehicles[self.index] = vehicle
             return True
         return False
     
     def unpark(self):
-        self.parked_vehicle = None
+        self.level.occupied[self.index] = 0
+        self.level.vehicles.pop(self.index, None)
         return True
     
 
 class Level:
-    def __init__(self, level_number: int, num_spots: int):
+    def __init__(self, level_number: int, num_spots: int,
+                 on_capacity_change: Optional[Callable[["Level", VehicleType, bool], None]] = None, stripes: int = 8,
+                 spot_types: Optional[bytes] = None, parked: Optional[Dict[int, Vehicle]] = None):
         self.level_number = level_number
-        self.spots: List[ParkingSpot] = []
-        self.level_lock = threading.Lock()
+        self.num_spots = num_spots
+        self.spot_types = bytearray(spot_types if spot_types is not None
+                                    else random.randbytes(num_spots).translate(SPOT_TYPE_TABLE))
+        self.occupied = bytearray(num_spots)
+        self.vehicles: Dict[int, Vehicle] = dict(parked or {})
+        for index in self.vehicles:
+            self.occupied[index] = 1
+        self.stripes = max(1, min(stripes, num_spots))
+        self.segment_size = -(-num_spots // self.stripes)
+        self.free_spots: Dict[VehicleType, List[array]] = {vehicle_type: [] for vehicle_type in VehicleType}
+        self.stripe_locks: Dict[VehicleType, List[threading.Lock]] = {
+            vehicle_type: [threading.Lock() for _ in range(self.stripes)] for vehicle_type in VehicleType}
+        self.available: Dict[VehicleType, int] = {vehicle_type: 0 for vehicle_type in VehicleType}
+        self.on_capacity_change = on_capacity_change
+        self.counter_lock = threading.Lock()
 
-        for i in range(1, num_spots+1):
-            spot_id = f"L_{level_number}-{i}"
-            vehicle_type = VehicleType.CAR if random.randint(0, 1) == 1 else VehicleType.TRUCK
-            self.spots.append(ParkingSpot(spot_id, vehicle_type))
+        for vehicle_type in VehicleType:
+            mask = self.spot_types.translate(MATCH_TABLES[vehicle_type])
+            if self.vehicles:
+                mask = (int.from_bytes(mask, "big") & ~int.from_bytes(self.occupied, "big")).to_bytes(num_spots, "big")
+            self.available[vehicle_type] = mask.count(1)
+            for stripe in range(self.stripes):
+                lo, hi = stripe * self.segment_size, min(num_spots, (stripe + 1) * self.segment_size)
+                self.free_spots[vehicle_type].append(array("i", compress(range(hi - 1, lo - 1, -1), mask[lo:hi][::-1])))
+
+    def spot(self, index: int) -> ParkingSpot:
+        return ParkingSpot(self, index)
+
+    def adjust_available(self, vehicle_type: VehicleType, delta: int):
+        with self.counter_lock:
+            before = self.available[vehicle_type]
+            self.available[vehicle_type] = before + delta
+            if self.on_capacity_change and (before == 0) != (before + delta == 0):
+                self.on_capacity_change(self, vehicle_type, before == 0)
         
-    def park_vehicle(self, vehicle: Vehicle):
-        with self.level_lock:
-            for spot in self.spots:
-                if (spot.is_free() and spot.spot_type == vehicle.vehicle_type):
-                    spot.park(vehicle)
-                    return spot
+    def park_vehicle(self, vehicle: Vehicle, gate: int = 0):
+        free_lists = self.free_spots[vehicle.vehicle_type]
+        locks = self.stripe_locks[vehicle.vehicle_type]
+        for offset in range(self.stripes):
+            stripe = (gate + offset) % self.stripes
+            free = free_lists[stripe]
+            if not free:
+                continue
+            with locks[stripe]:
+                if not free:
+                    continue
+                spot = ParkingSpot(self, free.pop())
+                spot.park(vehicle)
+            self.adjust_available(vehicle.vehicle_type, -1)
+            return spot
         return None
     
-    def unpark_vehicle(self, vehicle: Vehicle):
-        with self.level_lock:
-            for spot in self.spots:
-                if spot.parked_vehicle == vehicle:
-                    spot.unpark()
-                    return True
-        return False
+    def unpark_spot(self, spot: ParkingSpot):
+        stripe = spot.index // self.segment_size
+        with self.stripe_locks[spot.spot_type][stripe]:
+            if spot.is_free():
+                return False
+            spot_type = spot.spot_type
+            spot.unpark()
+            self.free_spots[spot_type][stripe].append(spot.index)
+        self.adjust_available(spot_type, 1)
+        return True
     
     def get_availability(self):
-        stats = {"TRUCK": 0, "CAR": 0}
-        for spot in self.spots:
-            if spot.is_free():
-                stats[spot.spot_type.name] += 1
-        return stats
+        with self.counter_lock:
+            return {vehicle_type.name: self.available[vehicle_type] for vehicle_type in (VehicleType.TRUCK, VehicleType.CAR)}
     
+VEHICLE_CLASSES = {VehicleType.CAR.value: Car, VehicleType.TRUCK.value: Truck}
+
+class JournalOp(Enum):
+    ADD_LEVEL = 1
+    PARK = 2
+    UNPARK = 3
+
+WAL_RECORD = struct.Struct("<BHIH")
+SNAPSHOT_LEVEL = struct.Struct("<HIHII")
+
+class RecoveredState:
+    def __init__(self):
+        self.levels: Dict[int, Tuple[int, int, bytes]] = {}
+        self.occupants: Dict[int, Dict[int, str]] = {}
+        self.locations: Dict[str, Tuple[int, int]] = {}
+
+    def add_level(self, level_number: int, num_spots: int, stripes: int, spot_types: bytes):
+        if level_number not in self.levels:
+            self.levels[level_number] = (num_spots, stripes, spot_types)
+            self.occupants[level_number] = {}
+
+    def park(self, name: str, level_number: int, index: int):
+        occupants = self.occupants.get(level_number)
+        if occupants is None:
+            return
+        self.unpark(name)
+        previous = occupants.get(index)
+        if previous is not None:
+            del self.locations[previous]
+        occupants[index] = name
+        self.locations[name] = (level_number, index)
+
+    def unpark(self, name: str):
+        location = self.locations.pop(name, None)
+        if location is not None:
+            self.occupants[location[0]].pop(location[1], None)
+
+class ParkingJournal:
+    def __init__(self, directory: str, fsync_interval: float = 0.05, snapshot_every: int = 100_000):
+        self.directory = directory
+        self.fsync_interval = fsync_interval
+        self.snapshot_every = snapshot_every
+        self.pending: deque = deque()
+        self.write_lock = threading.Lock()
+        self.records_since_snapshot = 0
+        self.stopped = threading.Event()
+        self.lot: Optional["ParkingLot"] = None
+
+        os.makedirs(directory, exist_ok=True)
+        self.seq = max(self.sequences("wal-", ".log") + self.sequences("snapshot-", ".bin") + [-1]) + 1
+        self.file = open(self.wal_path(self.seq), "ab")
+        self.flusher = threading.Thread(target=self.run_flusher, name="parking-journal", daemon=True)
+
+    def start(self, lot: "ParkingLot"):
+        self.lot = lot
+        self.flusher.start()
+
+    def sequences(self, prefix: str, suffix: str) -> List[int]:
+        return sorted(int(name[len(prefix):-len(suffix)]) for name in os.listdir(self.directory)
+                      if name.startswith(prefix) and name.endswith(suffix))
+
+    def wal_path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"wal-{seq:08d}.log")
+
+    def snapshot_path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"snapshot-{seq:08d}.bin")
+
+    def append(self, op: JournalOp, level_number: int, index: int, name: str = "", payload: bytes = b""):
+        self.pending.append((op.value, level_number, index, name, payload))
+
+    def drain(self):
+        with self.write_lock:
+            self.write_pending()
+
+    def write_pending(self):
+        chunks = []
+        while self.pending:
+            op, level_number, index, name, payload = self.pending.popleft()
+            encoded = name.encode()
+            chunks.append(WAL_RECORD.pack(op, level_number, index, len(encoded)) + encoded + payload)
+        if not chunks:
+            return
+        self.file.write(b"".join(chunks))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.records_since_snapshot += len(chunks)
+
+    def sync(self):
+        self.drain()
+
+    def run_flusher(self):
+        while not self.stopped.wait(self.fsync_interval):
+            self.drain()
+            if self.records_since_snapshot >= self.snapshot_every:
+                self.checkpoint()
+
+    def checkpoint(self):
+        with self.write_lock:
+            self.write_pending()
+            self.file.close()
+            self.seq += 1
+            self.file = open(self.wal_path(self.seq), "ab")
+            self.records_since_snapshot = 0
+        seq = self.seq
+
+        chunks = [struct.pack("<I", len(self.lot.levels))]
+        for level in list(self.lot.levels):
+            vehicles = dict(level.vehicles)
+            names = "\0".join(vehicle.name for vehicle in vehicles.values()).encode()
+            chunks.append(SNAPSHOT_LEVEL.pack(level.level_number, level.num_spots, level.stripes, len(vehicles), len(names)))
+            chunks.append(bytes(level.spot_types))
+            chunks.append(array("I", vehicles).tobytes())
+            chunks.append(names)
+
+        tmp_path = self.snapshot_path(seq) + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(b"".join(chunks))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path(seq))
+        for old in self.sequences("snapshot-", ".bin"):
+            if old < seq:
+                os.remove(self.snapshot_path(old))
+        for old in self.sequences("wal-", ".log"):
+            if old < seq:
+                os.remove(self.wal_path(old))
+
+    def recover(self) -> RecoveredState:
+        state = RecoveredState()
+        snapshots = self.sequences("snapshot-", ".bin")
+        start = snapshots[-1] if snapshots else 0
+        if snapshots:
+            with open(self.snapshot_path(start), "rb") as f:
+                data = f.read()
+            (num_levels,), pos = struct.unpack_from("<I", data), 4
+            for _ in range(num_levels):
+                level_number, num_spots, stripes, count, names_size = SNAPSHOT_LEVEL.unpack_from(data, pos)
+                pos += SNAPSHOT_LEVEL.size
+                state.add_level(level_number, num_spots, stripes, data[pos:pos + num_spots])
+                pos += num_spots
+                indices = array("I")
+                indices.frombytes(data[pos:pos + 4 * count])
+                pos += 4 * count
+                names = data[pos:pos + names_size].decode().split("\0") if count else []
+                pos += names_size
+                state.occupants[level_number].update(zip(indices, names))
+                state.locations.update(zip(names, zip([level_number] * count, indices)))
+
+        for seq in self.sequences("wal-", ".log"):
+            if seq < start:
+                continue
+            with open(self.wal_path(seq), "rb") as f:
+                data = f.read()
+            pos = 0
+            while pos + WAL_RECORD.size <= len(data):
+                op, level_number, index, length = WAL_RECORD.unpack_from(data, pos)
+                end = pos + WAL_RECORD.size + length
+                payload_end = end + (2 + index if op == JournalOp.ADD_LEVEL.value else 0)
+                if payload_end > len(data):
+                    break
+                name = data[pos + WAL_RECORD.size:end].decode()
+                if op == JournalOp.ADD_LEVEL.value:
+                    (stripes,) = struct.unpack_from("<H", data, end)
+                    state.add_level(level_number, index, stripes, data[end + 2:payload_end])
+                elif op == JournalOp.PARK.value:
+                    state.park(name, level_number, index)
+                else:
+                    state.unpark(name)
+                pos = payload_end
+        return state
+
+    def close(self):
+        self.stopped.set()
+        if self.flusher.is_alive():
+            self.flusher.join()
+        self.drain()
+        self.file.close()
+
 class ParkingLot:
     _instance = None
     _lock = threading.Lock()
@@ -90,28 +331,135 @@ class ParkingLot:
     
     def _initialize(self):
         self.levels: List[Level] = []
+        self.levels_with_space: Dict[VehicleType, int] = {vehicle_type: 0 for vehicle_type in VehicleType}
+        self.space_lock = threading.Lock()
+        self.location_stripes = 16
+        self.locations: List[Dict[str, Optional[Tuple[Level, ParkingSpot]]]] = [{} for _ in range(self.location_stripes)]
+        self.location_locks = [threading.Lock() for _ in range(self.location_stripes)]
+        self.journal: Optional[ParkingJournal] = None
+        self.verbose = True
+
+    def reset(self):
+        self._initialize()
 
-    def add_level(self, num_spots: int):
+    def add_level(self, num_spots: int, stripes: int = 8):
         level_num = len(self.levels) + 1
-        self.levels.append(Level(level_num, num_spots))
-        print(f"added level {level_num} with {num_spots} spots")
+        level = Level(level_num, num_spots, self.update_capacity, stripes)
+        self.levels.append(level)
+        if self.journal:
+            self.journal.append(JournalOp.ADD_LEVEL, level_num, num_spots,
+                                payload=struct.pack("<H", level.stripes) + bytes(level.spot_types))
+        self.open_level(level)
+        if self.verbose:
+            print(f"added level {level_num} with {num_spots} spots")
 
-    def park_vehicle(self, vehicle: Vehicle):
-        for level in self.levels:
-            spot = level.park_vehicle(vehicle)
+    def install_level(self, level: Level):
+        self.levels.append(level)
+        self.open_level(level)
+
+    def open_level(self, level: Level):
+        for vehicle_type, free in level.available.items():
+            if free:
+                self.update_capacity(level, vehicle_type, True)
+
+    def open_journal(self, directory: str, fsync_interval: float = 0.05, snapshot_every: int = 100_000):
+        if self.journal:
+            raise RuntimeError("a journal is already open, call close_journal() first")
+        if self.levels:
+            raise RuntimeError("open_journal() recovers into an empty lot, call it before add_level()")
+        journal = ParkingJournal(directory, fsync_interval, snapshot_every)
+        state = journal.recover()
+        for level_number in sorted(state.levels):
+            num_spots, stripes, spot_types = state.levels[level_number]
+            parked = {index: VEHICLE_CLASSES[spot_types[index]](name) for index, name in state.occupants[level_number].items()}
+            level = Level(level_number, num_spots, self.update_capacity, stripes, spot_types, parked)
+            self.install_level(level)
+            for index, vehicle in parked.items():
+                self.locations[self.location_stripe(vehicle.name)][vehicle.name] = (level, ParkingSpot(level, index))
+        self.journal = journal
+        journal.start(self)
+        if self.verbose:
+            print(f"recovered {len(self.levels)} levels and {len(state.locations)} parked vehicles from {directory}")
+
+    def checkpoint(self):
+        if self.journal:
+            self.journal.checkpoint()
+
+    def close_journal(self):
+        if self.journal:
+            self.journal.close()
+            self.journal = None
+
+    def update_capacity(self, level: Level, vehicle_type: VehicleType, has_space: bool):
+        bit = 1 << (level.level_number - 1)
+        with self.space_lock:
+            if has_space:
+                self.levels_with_space[vehicle_type] |= bit
+            else:
+                self.levels_with_space[vehicle_type] &= ~bit
+
+    def location_stripe(self, name: str) -> int:
+        return hash(name) % self.location_stripes
+
+    def park_vehicle(self, vehicle: Vehicle, gate: int = 0):
+        stripe = self.location_stripe(vehicle.name)
+        locations = self.locations[stripe]
+        with self.location_locks[stripe]:
+            if vehicle.name in locations:
+                if self.verbose:
+                    print(f"{vehicle.name} is already parked")
+                return False
+            locations[vehicle.name] = None
+
+        while True:
+            mask = self.levels_with_space[vehicle.vehicle_type]
+            if not mask:
+                with self.location_locks[stripe]:
+                    del locations[vehicle.name]
+                if self.verbose:
+                    print(f"no space for {vehicle.name}")
+                return False
+            level = self.levels[(mask & -mask).bit_length() - 1]
+            spot = level.park_vehicle(vehicle, gate)
             if spot:
-                print(f"{vehicle.name} parked at {spot.spot_id}")
+                with self.location_locks[stripe]:
+                    locations[vehicle.name] = (level, spot)
+                    if self.journal:
+                        self.journal.append(JournalOp.PARK, level.level_number, spot.index, vehicle.name)
+                if self.verbose:
+                    print(f"{vehicle.name} parked at {spot.spot_id}")
                 return True
-        print(f"no space for {vehicle.name}")
-        return False
     
     def unpark_vehicle(self, vehicle: Vehicle):
+        stripe = self.location_stripe(vehicle.name)
+        with self.location_locks[stripe]:
+            location = self.locations[stripe].get(vehicle.name)
+            parked = location[1].parked_vehicle if location is not None else None
+            if parked is not None and parked.name == vehicle.name and location[0].unpark_spot(location[1]):
+                del self.locations[stripe][vehicle.name]
+                if self.journal:
+                    self.journal.append(JournalOp.UNPARK, location[0].level_number, location[1].index, vehicle.name)
+            else:
+                location = None
+
+        if location is None:
+            if self.verbose:
+                print(f"{vehicle.name} not found")
+            return False
+        if self.verbose:
+            print(f"{vehicle.name} left")
+        return True
+
+    def find_vehicle(self, name: str) -> Optional[ParkingSpot]:
+        location = self.locations[self.location_stripe(name)].get(name)
+        return location[1] if location else None
+
+    def get_availability(self):
+        stats = {"TRUCK": 0, "CAR": 0}
         for level in self.levels:
-            if level.unpark_vehicle(vehicle):
-                print(f"{vehicle.name} left")
-                return True
-        print(f"{vehicle.name} not found")
-        return False
+            for name, count in level.get_availability().items():
+                stats[name] += count
+        return stats
     
     def display_availability(self):
         for level in self.levels:
@@ -136,16 +484,16 @@ def demo():
 
     parking_lot.display_availability()
 
-    def parker_worker(v):
+    def parker_worker(v, gate):
         time.sleep(random.uniform(0.1, 0.5))
-        parking_lot.park_vehicle(v)
+        parking_lot.park_vehicle(v, gate)
 
     threads = []
     extra_vehicles = [Car(f"car-X{i}") for i in range(5)]
     
     print("--- Starting Concurrent Parking ---")
-    for v in extra_vehicles:
-        t = threading.Thread(target=parker_worker, args=(v,))
+    for gate, v in enumerate(extra_vehicles):
+        t = threading.Thread(target=parker_worker, args=(v, gate))
         threads.append(t)
         t.start()
     
@@ -154,9 +502,32 @@ def demo():
     
     parking_lot.display_availability()
 
+    spot = parking_lot.find_vehicle("car-X0")
+    print(f"car-X0 is at {spot.spot_id if spot else 'nowhere'}")
+
     parking_lot.unpark_vehicle(c1)
     parking_lot.unpark_vehicle(t1)
+    parking_lot.unpark_vehicle(t2)
     
     parking_lot.display_availability()
+
+    print("--- Persistence ---")
+    directory = tempfile.mkdtemp(prefix="parking-")
+    parking_lot.reset()
+    parking_lot.open_journal(directory)
+    parking_lot.add_level(5)
+    parking_lot.park_vehicle(c1)
+    parking_lot.park_vehicle(t2)
+    parking_lot.checkpoint()
+    parking_lot.unpark_vehicle(c1)
+    parking_lot.close_journal()
+
+    parking_lot.reset()
+    parking_lot.open_journal(directory)
+    spot = parking_lot.find_vehicle("t2")
+    print(f"t2 is at {spot.spot_id if spot else 'nowhere'} after recovery")
+    parking_lot.display_availability()
+    parking_lot.close_journal()
+    shutil.rmtree(directory)
 if __name__ == "__main__":
     demo()
\ No newline at end of file
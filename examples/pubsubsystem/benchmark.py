@@ -0,0 +1,228 @@
+import asyncio
+import contextlib
+import io
+import os
+import threading
+import time
+from typing import List
+
+from main import PubSubSystem, AsyncPubSubSystem, Subscriber, AsyncSubscriber, ProcessSubscriber, Message, OverflowPolicy
+
+NUM_MESSAGES = 5000
+BATCH_SIZE = 100
+
+class CountingSubscriber(Subscriber):
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.count = 0
+
+    def print(self, name: str, msg: Message):
+        self.count += 1
+
+    def print_batch(self, name: str, msgs: List[Message]):
+        self.count += len(msgs)
+
+def run(num_subscribers: int, batched: bool) -> float:
+    pss = PubSubSystem()
+    topic = f"bench-{num_subscribers}-{'batch' if batched else 'single'}"
+    subs = [CountingSubscriber(f"{topic}-{i}") for i in range(num_subscribers)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        pss.create_topic(topic)
+        for sub in subs:
+            pss.subscribe(topic, sub, queue_size=NUM_MESSAGES, policy=OverflowPolicy.BLOCK,
+                          max_batch=BATCH_SIZE if batched else 1)
+
+    msgs = [Message(f"message {i}") for i in range(NUM_MESSAGES)]
+    start = time.perf_counter()
+    if batched:
+        for i in range(0, NUM_MESSAGES, BATCH_SIZE):
+            pss.publish_batch(topic, msgs[i:i + BATCH_SIZE])
+    else:
+        for msg in msgs:
+            pss.publish(topic, msg)
+    pss.flush()
+    elapsed = time.perf_counter() - start
+
+    assert all(sub.count == NUM_MESSAGES for sub in subs)
+    for sub in subs:
+        pss.unsubscribe(topic, sub)
+    return NUM_MESSAGES / elapsed
+
+def benchmark_batching():
+    for num_subscribers in (1, 10, 100):
+        single = run(num_subscribers, batched=False)
+        batched = run(num_subscribers, batched=True)
+        print(f"{num_subscribers:>3} subscribers | single: {single:>10,.0f} msgs/sec | "
+              f"batch of {BATCH_SIZE}: {batched:>10,.0f} msgs/sec")
+
+SLOW_DELAY = 0.2
+
+class SlowSubscriber(Subscriber):
+    def print(self, name: str, msg: Message):
+        time.sleep(SLOW_DELAY)
+
+class AsyncSlowSubscriber(AsyncSubscriber):
+    async def print(self, name: str, msg: Message):
+        await asyncio.sleep(SLOW_DELAY)
+
+def run_threaded(num_subscribers: int):
+    pss = PubSubSystem()
+    topic = f"slow-threaded-{num_subscribers}"
+    subs = [SlowSubscriber(f"{topic}-{i}") for i in range(num_subscribers)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        pss.create_topic(topic)
+        for sub in subs:
+            pss.subscribe(topic, sub)
+
+    threads = threading.active_count()
+    start = time.perf_counter()
+    pss.publish(topic, Message("slow"))
+    pss.flush()
+    elapsed = time.perf_counter() - start
+
+    for sub in subs:
+        pss.unsubscribe(topic, sub)
+    return elapsed, threads
+
+async def run_async(num_subscribers: int):
+    pss = AsyncPubSubSystem()
+    topic = f"slow-async-{num_subscribers}"
+    subs = [AsyncSlowSubscriber(f"{topic}-{i}") for i in range(num_subscribers)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        pss.create_topic(topic)
+        for sub in subs:
+            pss.subscribe(topic, sub)
+
+    threads = threading.active_count()
+    start = time.perf_counter()
+    await pss.publish(topic, Message("slow"))
+    await pss.flush()
+    elapsed = time.perf_counter() - start
+
+    await pss.shutdown()
+    return elapsed, threads
+
+def benchmark_slow_subscribers():
+    for num_subscribers in (100, 1000, 2000):
+        threaded_time, threaded_threads = run_threaded(num_subscribers)
+        async_time, async_threads = asyncio.run(run_async(num_subscribers))
+        print(f"{num_subscribers:>5} slow subscribers ({SLOW_DELAY}s each) | "
+              f"threaded: {threaded_time:.2f}s with {threaded_threads} threads | "
+              f"asyncio: {async_time:.2f}s with {async_threads} threads")
+
+def stress_subscription_churn(duration: float = 2.0, publishers: int = 4, churners: int = 4):
+    pss = PubSubSystem()
+    topic = "churn"
+    stable = CountingSubscriber("churn-stable")
+    with contextlib.redirect_stdout(io.StringIO()):
+        pss.create_topic(topic)
+        pss.subscribe(topic, stable, queue_size=1 << 20, policy=OverflowPolicy.BLOCK)
+
+    stop = threading.Event()
+    errors = []
+    published = [0] * publishers
+
+    def publisher(n: int):
+        msg = Message("churn")
+        try:
+            while not stop.is_set():
+                pss.publish(topic, msg)
+                published[n] += 1
+        except Exception as e:
+            errors.append(e)
+
+    def churner(n: int):
+        subs = [CountingSubscriber(f"churn-{n}-{i}") for i in range(10)]
+        try:
+            while not stop.is_set():
+                for sub in subs:
+                    pss.subscribe(topic, sub)
+                for sub in subs:
+                    pss.unsubscribe(topic, sub)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=publisher, args=(n,)) for n in range(publishers)]
+    threads += [threading.Thread(target=churner, args=(n,)) for n in range(churners)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        for t in threads:
+            t.start()
+        time.sleep(duration)
+        stop.set()
+        for t in threads:
+            t.join()
+    pss.flush()
+    pss.unsubscribe(topic, stable)
+
+    assert not errors, errors
+    assert stable.count == sum(published)
+    print(f"subscription churn: {sum(published):,} messages published during churn, no errors")
+
+def check_group_leave(num_messages: int = 200):
+    pss = PubSubSystem()
+    topic = "group-leave"
+    members = [CountingSubscriber(f"group-leave-{i}") for i in range(2)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        pss.create_topic(topic, partitions=4)
+        for member in members:
+            pss.join_group(topic, "workers", member, policy=OverflowPolicy.BLOCK)
+        for i in range(num_messages):
+            pss.publish(topic, Message(f"job-{i}", key=str(i)))
+        pss.leave_group(topic, "workers", members[0])
+        pss.flush()
+        pss.leave_group(topic, "workers", members[1])
+
+    processed = sum(member.count for member in members)
+    assert processed == num_messages, f"group processed {processed} of {num_messages} messages"
+    print(f"group leave: {processed} of {num_messages} messages processed")
+
+PAYLOAD_SIZE = 256 * 1024
+CPU_MESSAGES = 400
+
+def score(name: str, msgs: List[Message]):
+    for msg in msgs:
+        total = 0
+        for b in msg.data[::16]:
+            total = (total * 31 + b) % 1000003
+
+class ThreadScoringSubscriber(Subscriber):
+    def print(self, name: str, msg: Message):
+        score(name, [msg])
+
+    def print_batch(self, name: str, msgs: List[Message]):
+        score(name, msgs)
+
+def run_cpu_bound(subscriber: Subscriber) -> float:
+    pss = PubSubSystem()
+    topic = f"cpu-{subscriber.name}"
+    with contextlib.redirect_stdout(io.StringIO()):
+        pss.create_topic(topic)
+        pss.subscribe(topic, subscriber, queue_size=CPU_MESSAGES, policy=OverflowPolicy.BLOCK, max_batch=100)
+
+    msgs = [Message(f"payload {i}", os.urandom(PAYLOAD_SIZE)) for i in range(CPU_MESSAGES)]
+    start = time.perf_counter()
+    pss.publish_batch(topic, msgs)
+    pss.flush()
+    elapsed = time.perf_counter() - start
+    pss.unsubscribe(topic, subscriber)
+    return CPU_MESSAGES / elapsed
+
+def benchmark_cores():
+    cores = os.cpu_count() or 1
+    print(f"cpu-bound subscriber, {PAYLOAD_SIZE // 1024} KiB payloads, {cores} cores available")
+    print(f"  thread subscriber: {run_cpu_bound(ThreadScoringSubscriber('thread')):>8,.1f} msgs/sec")
+
+    workers = 1
+    while workers <= max(2, cores):
+        subscriber = ProcessSubscriber(f"process-{workers}", score, workers=workers)
+        rate = run_cpu_bound(subscriber)
+        subscriber.close()
+        print(f"  process subscriber, {workers:>2} workers: {rate:>8,.1f} msgs/sec")
+        workers *= 2
+
+if __name__ == "__main__":
+    benchmark_batching()
+    benchmark_slow_subscribers()
+    stress_subscription_churn()
+    check_group_leave()
+    benchmark_cores()
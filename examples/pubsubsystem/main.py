@@ -1,40 +1,582 @@
 import threading
-from typing import Set, Dict
-import concurrent.futures
+import asyncio
+from typing import Set, Dict, Optional, List
+from enum import Enum
+from collections import deque
+import atexit
 import time
+import os
+import mmap
+import struct
+import bisect
+import tempfile
+import pickle
+import concurrent.futures
+import itertools
+import zlib
+from multiprocessing import shared_memory
+from array import array
+
+OUT_OF_BAND_THRESHOLD = 64 * 1024
 
 class Message:
-    def __init__(self, msg: str):
+    def __init__(self, msg: str, data: Optional[bytes] = None, key: Optional[str] = None):
         self.msg = msg
+        self.data = data
+        self.key = key
+
+    def __reduce_ex__(self, protocol):
+        if protocol >= 5 and self.data is not None and len(self.data) >= OUT_OF_BAND_THRESHOLD:
+            return (Message, (self.msg, pickle.PickleBuffer(self.data), self.key))
+        return (Message, (self.msg, self.data, self.key))
 
 class Subscriber:
     def __init__(self, name: str):
         self.name = name
+        self.offsets: Dict[str, int] = {}
 
     def print(self, name: str, msg: Message):
         thread_name = threading.current_thread().name
         print(f"{thread_name} received from {name} : {msg.msg}")
         time.sleep(0.5)
 
+    def print_batch(self, name: str, msgs: List[Message]):
+        for msg in msgs:
+            self.print(name, msg)
+
+RECORD_HEADER = struct.Struct("<IIQq")
+
+class Segment:
+    def __init__(self, path: str, base_offset: int):
+        self.path = path
+        self.base_offset = base_offset
+        self.positions = array("Q")
+        self.timestamps = array("q")
+        self.size = 0
+        self.map: Optional[mmap.mmap] = None
+        self.mapped_size = 0
+
+        if os.path.exists(path):
+            self.load()
+        self.file = open(path, "ab", buffering=0)
+
+    def load(self):
+        with open(self.path, "rb") as f:
+            data = f.read()
+        pos = 0
+        while pos + RECORD_HEADER.size <= len(data):
+            text_length, data_length, _, timestamp_ns = RECORD_HEADER.unpack_from(data, pos)
+            length = text_length + data_length
+            if pos + RECORD_HEADER.size + length > len(data):
+                break
+            self.positions.append(pos)
+            self.timestamps.append(timestamp_ns)
+            pos += RECORD_HEADER.size + length
+        if pos < len(data):
+            with open(self.path, "r+b") as f:
+                f.truncate(pos)
+        self.size = pos
+
+    @property
+    def next_offset(self) -> int:
+        return self.base_offset + len(self.positions)
+
+    def append(self, offset: int, timestamp_ns: int, text: bytes, data: bytes):
+        self.file.write(RECORD_HEADER.pack(len(text), len(data), offset, timestamp_ns) + text + data)
+        self.positions.append(self.size)
+        self.timestamps.append(timestamp_ns)
+        self.size += RECORD_HEADER.size + len(text) + len(data)
+
+    def read(self, offset: int, max_count: int) -> List[tuple]:
+        if self.size == 0:
+            return []
+        if self.mapped_size < self.size:
+            if self.map:
+                self.map.close()
+            with open(self.path, "rb") as f:
+                self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.mapped_size = len(self.map)
+
+        records = []
+        index = offset - self.base_offset
+        end = min(len(self.positions), index + max_count)
+        for i in range(index, end):
+            pos = self.positions[i]
+            if pos >= self.mapped_size:
+                break
+            text_length, data_length, record_offset, timestamp_ns = RECORD_HEADER.unpack_from(self.map, pos)
+            start = pos + RECORD_HEADER.size
+            text = self.map[start:start + text_length].decode()
+            data = self.map[start + text_length:start + text_length + data_length] if data_length else None
+            records.append((record_offset, timestamp_ns, Message(text, data)))
+        return records
+
+    def close(self):
+        self.file.close()
+        if self.map:
+            self.map.close()
+            self.map = None
+
+    def delete(self):
+        self.close()
+        os.remove(self.path)
+
+class TopicLog:
+    def __init__(self, directory: str, segment_bytes: int = 1 << 20,
+                 retention_bytes: Optional[int] = None, retention_age: Optional[float] = None):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.retention_bytes = retention_bytes
+        self.retention_age = retention_age
+        self.lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        bases = sorted(int(f[:-4]) for f in os.listdir(directory) if f.endswith(".log"))
+        self.segments: List[Segment] = [Segment(self.segment_path(base), base) for base in bases]
+        if not self.segments:
+            self.segments.append(Segment(self.segment_path(0), 0))
+        self.bases = [seg.base_offset for seg in self.segments]
+
+    def segment_path(self, base_offset: int) -> str:
+        return os.path.join(self.directory, f"{base_offset:020d}.log")
+
+    @property
+    def start_offset(self) -> int:
+        return self.segments[0].base_offset
+
+    @property
+    def end_offset(self) -> int:
+        return self.segments[-1].next_offset
+
+    def append(self, msg: Message) -> int:
+        text = msg.msg.encode()
+        data = bytes(msg.data) if msg.data is not None else b""
+        with self.lock:
+            active = self.segments[-1]
+            if active.size >= self.segment_bytes:
+                active = Segment(self.segment_path(active.next_offset), active.next_offset)
+                self.segments.append(active)
+                self.bases.append(active.base_offset)
+                self.apply_retention()
+            offset = active.next_offset
+            active.append(offset, time.time_ns(), text, data)
+            return offset
+
+    def apply_retention(self):
+        now_ns = time.time_ns()
+        total = sum(seg.size for seg in self.segments)
+        while len(self.segments) > 1:
+            oldest = self.segments[0]
+            too_big = self.retention_bytes is not None and total > self.retention_bytes
+            too_old = (self.retention_age is not None and len(oldest.timestamps) > 0
+                       and now_ns - oldest.timestamps[-1] > self.retention_age * 1e9)
+            if not (too_big or too_old):
+                break
+            total -= oldest.size
+            self.segments.pop(0)
+            self.bases.pop(0)
+            oldest.delete()
+
+    def read(self, offset: int, max_count: int = 1000) -> List[tuple]:
+        with self.lock:
+            offset = max(offset, self.start_offset)
+            if offset >= self.end_offset:
+                return []
+            segment = self.segments[bisect.bisect_right(self.bases, offset) - 1]
+            return segment.read(offset, max_count)
+
+    def offset_for_timestamp(self, timestamp_ns: int) -> int:
+        with self.lock:
+            for segment in self.segments:
+                if len(segment.timestamps) and segment.timestamps[-1] >= timestamp_ns:
+                    return segment.base_offset + bisect.bisect_left(segment.timestamps, timestamp_ns)
+            return self.end_offset
+
+    def close(self):
+        with self.lock:
+            for segment in self.segments:
+                segment.close()
+
+class AsyncSubscriber(Subscriber):
+    async def print(self, name: str, msg: Message):
+        print(f"{self.name} received from {name} : {msg.msg}")
+        await asyncio.sleep(0.5)
+
+def pack_shared(msgs: List[Message]):
+    buffers: List[pickle.PickleBuffer] = []
+    header = pickle.dumps(msgs, protocol=5, buffer_callback=buffers.append)
+    blocks = []
+    for buffer in buffers:
+        raw = buffer.raw()
+        shm = shared_memory.SharedMemory(create=True, size=max(1, raw.nbytes))
+        shm.buf[:raw.nbytes] = raw
+        blocks.append((shm, raw.nbytes))
+    return header, blocks
+
+def process_batch(handler, name: str, header: bytes, blocks: List[tuple]) -> int:
+    shms = [shared_memory.SharedMemory(name=block_name) for block_name, _ in blocks]
+    views = [shm.buf[:size] for shm, (_, size) in zip(shms, blocks)]
+    try:
+        msgs = pickle.loads(header, buffers=views)
+        handler(name, msgs)
+        count = len(msgs)
+        del msgs
+        return count
+    finally:
+        for view in views:
+            view.release()
+        for shm in shms:
+            shm.close()
+
+class ProcessSubscriber(Subscriber):
+    def __init__(self, name: str, handler, workers: Optional[int] = None):
+        super().__init__(name)
+        self.handler = handler
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+
+    def print(self, name: str, msg: Message):
+        self.print_batch(name, [msg])
+
+    def print_batch(self, name: str, msgs: List[Message]):
+        chunk_size = -(-len(msgs) // self.workers)
+        futures = []
+        shms = []
+        try:
+            for i in range(0, len(msgs), chunk_size):
+                header, blocks = pack_shared(msgs[i:i + chunk_size])
+                shms.extend(shm for shm, _ in blocks)
+                names = [(shm.name, size) for shm, size in blocks]
+                futures.append(self.executor.submit(process_batch, self.handler, name, header, names))
+            for future in futures:
+                future.result()
+        finally:
+            concurrent.futures.wait(futures)
+            for shm in shms:
+                shm.close()
+                shm.unlink()
+
+    def close(self):
+        self.executor.shutdown()
+
+class ConsumerGroup:
+    def __init__(self, name: str, num_partitions: int):
+        self.name = name
+        self.num_partitions = num_partitions
+        self.members: List[Subscriber] = []
+        self.assignment: tuple = ()
+        self.lock = threading.Lock()
+
+    def join(self, subscriber: Subscriber):
+        with self.lock:
+            if subscriber not in self.members:
+                self.members.append(subscriber)
+                self.rebalance()
+
+    def leave(self, subscriber: Subscriber):
+        with self.lock:
+            if subscriber in self.members:
+                self.members.remove(subscriber)
+                self.rebalance()
+
+    def rebalance(self):
+        if self.members:
+            self.assignment = tuple(self.members[p % len(self.members)] for p in range(self.num_partitions))
+        else:
+            self.assignment = ()
+        print(f"group {self.name} rebalanced: {self.get_assignment()}")
+
+    def has_member(self, subscriber: Subscriber) -> bool:
+        return subscriber in self.members
+
+    def owner(self, partition: int) -> Optional[Subscriber]:
+        assignment = self.assignment
+        return assignment[partition] if assignment else None
+
+    def get_assignment(self) -> Dict[str, List[int]]:
+        owned: Dict[str, List[int]] = {}
+        for partition, member in enumerate(self.assignment):
+            owned.setdefault(member.name, []).append(partition)
+        return owned
+
 class Topic:
-    def __init__(self, name: str):
+    def __init__(self, name: str, log: Optional[TopicLog] = None, num_partitions: int = 1):
         self.name = name
+        self.log = log
+        self.num_partitions = num_partitions
+        self.round_robin = itertools.count()
         self.subscribers: Set[Subscriber] = set()
+        self.snapshot: tuple = ()
+        self.groups: Dict[str, ConsumerGroup] = {}
+        self.group_snapshot: tuple = ()
         self.lock = threading.Lock()
 
+    def partition_for(self, msg: Message) -> int:
+        if msg.key is None:
+            return next(self.round_robin) % self.num_partitions
+        return zlib.crc32(msg.key.encode()) % self.num_partitions
+
+    def get_group(self, name: str) -> ConsumerGroup:
+        with self.lock:
+            group = self.groups.get(name)
+            if group is None:
+                group = self.groups[name] = ConsumerGroup(name, self.num_partitions)
+                self.group_snapshot = tuple(self.groups.values())
+            return group
+
+    def get_groups(self) -> tuple:
+        return self.group_snapshot
+
     def add_subscriber(self, subscriber: Subscriber):
         with self.lock:
             self.subscribers.add(subscriber)
+            self.snapshot = tuple(self.subscribers)
             print(f"{subscriber.name} subscribed to {self.name}")
 
     def remove_subscriber(self, subscriber: Subscriber):
         with self.lock:
             if subscriber in self.subscribers:
                 self.subscribers.remove(subscriber)
+                self.snapshot = tuple(self.subscribers)
+
+    def has_subscriber(self, subscriber: Subscriber) -> bool:
+        return subscriber in self.subscribers
+
+    def get_subscribers(self) -> tuple:
+        return self.snapshot
+
+
+class TrieNode:
+    def __init__(self):
+        self.children: Dict[str, "TrieNode"] = {}
+        self.subscribers: Set[Subscriber] = set()
+
+class TopicRouter:
+    def __init__(self):
+        self.root = TrieNode()
+        self.patterns: Dict[Subscriber, Set[str]] = {}
+        self.cache: Dict[str, tuple] = {}
+        self.version = 0
+        self.lock = threading.Lock()
+
+    def add(self, pattern: str, subscriber: Subscriber):
+        with self.lock:
+            node = self.root
+            for part in pattern.split("."):
+                node = node.children.setdefault(part, TrieNode())
+            node.subscribers.add(subscriber)
+            self.patterns.setdefault(subscriber, set()).add(pattern)
+            self.invalidate_locked()
+
+    def remove(self, pattern: str, subscriber: Subscriber):
+        with self.lock:
+            path = [self.root]
+            for part in pattern.split("."):
+                node = path[-1].children.get(part)
+                if node is None:
+                    return
+                path.append(node)
+            path[-1].subscribers.discard(subscriber)
+
+            parts = pattern.split(".")
+            for i in range(len(parts), 0, -1):
+                node = path[i]
+                if node.subscribers or node.children:
+                    break
+                del path[i - 1].children[parts[i - 1]]
+
+            patterns = self.patterns.get(subscriber)
+            if patterns:
+                patterns.discard(pattern)
+                if not patterns:
+                    del self.patterns[subscriber]
+            self.invalidate_locked()
+
+    def has_subscriber(self, subscriber: Subscriber) -> bool:
+        return subscriber in self.patterns
+
+    def invalidate_locked(self, name: Optional[str] = None):
+        self.version += 1
+        if name is None:
+            self.cache.clear()
+        else:
+            self.cache.pop(name, None)
+
+    def invalidate(self, name: Optional[str] = None):
+        with self.lock:
+            self.invalidate_locked(name)
+
+    def match(self, name: str) -> Set[Subscriber]:
+        parts = name.split(".")
+        matched: Set[Subscriber] = set()
+        seen = set()
+        stack = [(self.root, 0)]
+        while stack:
+            node, i = stack.pop()
+            if (id(node), i) in seen:
+                continue
+            seen.add((id(node), i))
+
+            if i == len(parts):
+                matched |= node.subscribers
+            else:
+                child = node.children.get(parts[i])
+                if child:
+                    stack.append((child, i + 1))
+                child = node.children.get("*")
+                if child:
+                    stack.append((child, i + 1))
+
+            child = node.children.get("#")
+            if child:
+                for j in range(i, len(parts) + 1):
+                    stack.append((child, j))
+        return matched
 
-    def get_subscribers(self):
-        return self.subscribers
+    def resolve(self, topic: "Topic") -> tuple:
+        subs = self.cache.get(topic.name)
+        if subs is None:
+            version = self.version
+            subs = tuple(set(topic.get_subscribers()) | self.match(topic.name))
+            with self.lock:
+                if version == self.version:
+                    self.cache[topic.name] = subs
+        return subs
 
+class OverflowPolicy(Enum):
+    BLOCK = 1
+    DROP_OLDEST = 2
+    DROP_NEWEST = 3
+
+class SubscriberQueue:
+    def __init__(self, subscriber: Subscriber, max_size: int = 1000, policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+                 max_batch: int = 1, linger: float = 0.0):
+        self.subscriber = subscriber
+        self.max_size = max_size
+        self.policy = policy
+        self.max_batch = max_batch
+        self.linger = linger
+        self.queue: deque = deque()
+        self.is_running = True
+
+        self.enqueued = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.failed = 0
+        self.in_flight = 0
+
+        self.lock = threading.Lock()
+        self.not_empty = threading.Condition(self.lock)
+        self.not_full = threading.Condition(self.lock)
+        self.drained = threading.Condition(self.lock)
+
+        self.thread = threading.Thread(target=self.run_loop, name=f"sub-{subscriber.name}", daemon=True)
+        self.thread.start()
+
+    def offer(self, name: str, msg: Message, offset: Optional[int] = None) -> bool:
+        return self.offer_batch(name, [msg], None if offset is None else [offset]) == 1
+
+    def offer_batch(self, name: str, msgs: List[Message], offsets: Optional[List[int]] = None, block: bool = False) -> int:
+        with self.lock:
+            if not self.is_running:
+                return 0
+            now = time.monotonic()
+            accepted = 0
+            policy = OverflowPolicy.BLOCK if block else self.policy
+            for i, msg in enumerate(msgs):
+                if len(self.queue) >= self.max_size:
+                    if policy == OverflowPolicy.DROP_NEWEST:
+                        self.dropped += len(msgs) - accepted
+                        break
+                    elif policy == OverflowPolicy.DROP_OLDEST:
+                        self.queue.popleft()
+                        self.dropped += 1
+                    else:
+                        self.not_empty.notify()
+                        while len(self.queue) >= self.max_size and self.is_running:
+                            self.not_full.wait()
+                        if not self.is_running:
+                            break
+                self.queue.append((name, msg, now, offsets[i] if offsets else None))
+                accepted += 1
+            self.enqueued += accepted
+            self.not_empty.notify()
+            return accepted
+
+    def run_loop(self):
+        while True:
+            with self.lock:
+                while not self.queue and self.is_running:
+                    self.not_empty.wait()
+                if not self.queue:
+                    return
+                if self.linger and len(self.queue) < self.max_batch and self.is_running:
+                    deadline = time.monotonic() + self.linger
+                    while len(self.queue) < self.max_batch and self.is_running:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self.not_empty.wait(remaining)
+                batch = [self.queue.popleft() for _ in range(min(self.max_batch, len(self.queue)))]
+                self.in_flight = len(batch)
+                self.not_full.notify_all()
+
+            start = 0
+            delivered = 0
+            while start < len(batch):
+                name = batch[start][0]
+                end = start
+                while end < len(batch) and batch[end][0] == name:
+                    end += 1
+                msgs = [item[1] for item in batch[start:end]]
+                last_offset = batch[end - 1][3]
+                try:
+                    if len(msgs) == 1:
+                        self.subscriber.print(name, msgs[0])
+                    else:
+                        self.subscriber.print_batch(name, msgs)
+                    delivered += len(msgs)
+                    if last_offset is not None:
+                        self.subscriber.offsets[name] = max(self.subscriber.offsets.get(name, 0), last_offset + 1)
+                except Exception as e:
+                    self.failed += len(msgs)
+                    print(f"failed to deliver to {self.subscriber.name} : {e}")
+                start = end
+
+            with self.lock:
+                self.in_flight = 0
+                self.delivered += delivered
+                if not self.queue:
+                    self.drained.notify_all()
+
+    def get_metrics(self):
+        with self.lock:
+            oldest = self.queue[0][2] if self.queue else None
+            return {
+                "depth": len(self.queue),
+                "lag": len(self.queue) + self.in_flight,
+                "oldest_age": time.monotonic() - oldest if oldest is not None else 0.0,
+                "enqueued": self.enqueued,
+                "delivered": self.delivered,
+                "dropped": self.dropped,
+                "failed": self.failed,
+            }
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        with self.lock:
+            return self.drained.wait_for(lambda: not self.queue and self.in_flight == 0, timeout)
+
+    def stop(self, timeout: Optional[float] = None, drain: bool = False):
+        with self.lock:
+            self.is_running = False
+            if not drain:
+                self.dropped += len(self.queue)
+                self.queue.clear()
+                self.drained.notify_all()
+            self.not_empty.notify_all()
+            self.not_full.notify_all()
+        if drain or timeout is not None:
+            self.thread.join(timeout)
 
 class PubSubSystem:
     instance = None
@@ -48,41 +590,323 @@ class PubSubSystem:
                     cls.instance.initialize()
         return cls.instance
     
-    def initialize(self):
+    def initialize(self, queue_size: int = 1000, policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+                   max_batch: int = 100, linger: float = 0.0):
         self.topics: Dict[str, Topic] = {}
         self.topic_lock = threading.Lock()
 
-        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=5, thread_name_prefix="worker")
+        self.queue_size = queue_size
+        self.policy = policy
+        self.max_batch = max_batch
+        self.linger = linger
+        self.queues: Dict[Subscriber, SubscriberQueue] = {}
+        self.queue_lock = threading.Lock()
+        self.router = TopicRouter()
+        atexit.register(self.shutdown)
 
-    def create_topic(self, name: str):
+    def create_topic(self, name: str, log_dir: Optional[str] = None, partitions: int = 1, **log_options):
         with self.topic_lock:
             if name not in self.topics:
-                self.topics[name] = Topic(name)
+                log = TopicLog(os.path.join(log_dir, name), **log_options) if log_dir else None
+                self.topics[name] = Topic(name, log, partitions)
                 print(f"cretaed topic {name}")
             return self.topics[name]
         
-    def subscribe(self, name: str, subscriber: Subscriber):
-        topic = self.topics[name]
+    def subscribe(self, name: str, subscriber: Subscriber, queue_size: Optional[int] = None, policy: Optional[OverflowPolicy] = None,
+                  max_batch: Optional[int] = None, linger: Optional[float] = None):
+        topic = self.topics.get(name)
         if topic:
-            topic.add_subscriber(subscriber)
+            with self.queue_lock:
+                self.ensure_queue_locked(subscriber, queue_size, policy, max_batch, linger)
+                topic.add_subscriber(subscriber)
+            self.router.invalidate(name)
         else:
             print(f"topic {name} doesn't exist")
+
+    def subscribe_pattern(self, pattern: str, subscriber: Subscriber, queue_size: Optional[int] = None, policy: Optional[OverflowPolicy] = None,
+                          max_batch: Optional[int] = None, linger: Optional[float] = None):
+        with self.queue_lock:
+            self.ensure_queue_locked(subscriber, queue_size, policy, max_batch, linger)
+            self.router.add(pattern, subscriber)
+        print(f"{subscriber.name} subscribed to pattern {pattern}")
+
+    def ensure_queue_locked(self, subscriber: Subscriber, queue_size: Optional[int], policy: Optional[OverflowPolicy],
+                            max_batch: Optional[int], linger: Optional[float]):
+        if subscriber not in self.queues:
+            self.queues[subscriber] = SubscriberQueue(
+                subscriber,
+                queue_size or self.queue_size,
+                policy or self.policy,
+                max_batch or self.max_batch,
+                self.linger if linger is None else linger,
+            )
+
+    def join_group(self, name: str, group_name: str, subscriber: Subscriber, queue_size: Optional[int] = None,
+                   policy: Optional[OverflowPolicy] = None, max_batch: Optional[int] = None, linger: Optional[float] = None):
+        topic = self.topics.get(name)
+        if topic:
+            with self.queue_lock:
+                self.ensure_queue_locked(subscriber, queue_size, policy, max_batch, linger)
+                topic.get_group(group_name).join(subscriber)
+        else:
+            print(f"topic {name} doesn't exist")
+
+    def leave_group(self, name: str, group_name: str, subscriber: Subscriber):
+        topic = self.topics.get(name)
+        with self.queue_lock:
+            if topic:
+                topic.get_group(group_name).leave(subscriber)
+            queue = self.release_queue_locked(subscriber)
+        if queue:
+            queue.stop(drain=True)
+
+    def unsubscribe(self, name: str, subscriber: Subscriber):
+        topic = self.topics.get(name)
+        with self.queue_lock:
+            if topic:
+                topic.remove_subscriber(subscriber)
+            queue = self.release_queue_locked(subscriber)
+        if topic:
+            self.router.invalidate(name)
+        if queue:
+            queue.stop()
+
+    def unsubscribe_pattern(self, pattern: str, subscriber: Subscriber):
+        with self.queue_lock:
+            self.router.remove(pattern, subscriber)
+            queue = self.release_queue_locked(subscriber)
+        if queue:
+            queue.stop()
+
+    def release_queue_locked(self, subscriber: Subscriber) -> Optional[SubscriberQueue]:
+        if self.router.has_subscriber(subscriber):
+            return None
+        for t in list(self.topics.values()):
+            if t.has_subscriber(subscriber) or any(g.has_member(subscriber) for g in t.get_groups()):
+                return None
+        return self.queues.pop(subscriber, None)
         
     def publish(self, name: str, msg: Message):
-        topic = self.topics[name]
+        topic = self.topics.get(name)
         if topic:
-            subs = topic.get_subscribers()
+            offset = topic.log.append(msg) if topic.log else None
+            subs = self.router.resolve(topic)
 
             for sub in subs:
-                self.executor.submit(self.notify_subscriber, sub, name, msg)
+                queue = self.queues.get(sub)
+                if queue:
+                    queue.offer(name, msg, offset)
+
+            groups = topic.get_groups()
+            if groups:
+                partition = topic.partition_for(msg)
+                for group in groups:
+                    queue = self.queues.get(group.owner(partition))
+                    if queue:
+                        queue.offer(name, msg, offset)
         else:
             print(f"topic {name} doesn't exist")
 
-    def notify_subscriber(self, subscriber: Subscriber, name: str, msg: Message):
-        try:
-            subscriber.print(name, msg)
-        except Exception as e:
-            print(f"failed to deliver to {subscriber.name} : {e}")
+    def publish_batch(self, name: str, msgs: List[Message]):
+        topic = self.topics.get(name)
+        if topic:
+            msgs = list(msgs)
+            offsets = [topic.log.append(msg) for msg in msgs] if topic.log else None
+            for sub in self.router.resolve(topic):
+                queue = self.queues.get(sub)
+                if queue:
+                    queue.offer_batch(name, msgs, offsets)
+
+            groups = topic.get_groups()
+            if groups:
+                partitions = [topic.partition_for(msg) for msg in msgs]
+                for group in groups:
+                    routed: Dict[Subscriber, tuple] = {}
+                    for i, partition in enumerate(partitions):
+                        owner = group.owner(partition)
+                        if owner is not None:
+                            batch = routed.setdefault(owner, ([], []))
+                            batch[0].append(msgs[i])
+                            batch[1].append(offsets[i] if offsets else None)
+                    for owner, (owned_msgs, owned_offsets) in routed.items():
+                        queue = self.queues.get(owner)
+                        if queue:
+                            queue.offer_batch(name, owned_msgs, owned_offsets if offsets else None)
+        else:
+            print(f"topic {name} doesn't exist")
+
+    def replay(self, name: str, subscriber: Subscriber, from_offset: Optional[int] = None, from_timestamp: Optional[float] = None) -> int:
+        topic = self.topics.get(name)
+        queue = self.queues.get(subscriber)
+        if not topic or not topic.log or not queue:
+            print(f"cannot replay {name} to {subscriber.name}")
+            return 0
+
+        if from_offset is None:
+            if from_timestamp is not None:
+                from_offset = topic.log.offset_for_timestamp(int(from_timestamp * 1e9))
+            else:
+                from_offset = subscriber.offsets.get(name, 0)
+
+        offset = from_offset
+        replayed = 0
+        while True:
+            records = topic.log.read(offset)
+            if not records:
+                return replayed
+            replayed += queue.offer_batch(name, [r[2] for r in records], [r[0] for r in records], block=True)
+            offset = records[-1][0] + 1
+
+    def get_metrics(self):
+        return {sub.name: queue.get_metrics() for sub, queue in list(self.queues.items())}
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        return all(queue.drain(timeout) for queue in list(self.queues.values()))
+
+    def shutdown(self, timeout: Optional[float] = None):
+        for queue in list(self.queues.values()):
+            queue.stop()
+        if timeout is not None:
+            for queue in list(self.queues.values()):
+                queue.thread.join(timeout)
+
+class AsyncSubscriberQueue:
+    def __init__(self, subscriber: Subscriber, max_size: int, policy: OverflowPolicy, concurrency: int):
+        self.subscriber = subscriber
+        self.policy = policy
+        self.queue: asyncio.Queue = asyncio.Queue(max_size)
+        self.is_async = asyncio.iscoroutinefunction(subscriber.print)
+        self.delivered = 0
+        self.dropped = 0
+        self.failed = 0
+        self.concurrency = concurrency
+        self.workers: List[asyncio.Task] = []
+
+    def start(self):
+        if not self.workers:
+            self.workers = [asyncio.create_task(self.run_loop()) for _ in range(self.concurrency)]
+
+    async def offer(self, name: str, msg: Message, offset: Optional[int]) -> bool:
+        self.start()
+        item = (name, msg, offset)
+        if self.policy == OverflowPolicy.BLOCK:
+            await self.queue.put(item)
+            return True
+        if self.queue.full():
+            if self.policy == OverflowPolicy.DROP_NEWEST:
+                self.dropped += 1
+                return False
+            self.queue.get_nowait()
+            self.queue.task_done()
+            self.dropped += 1
+        self.queue.put_nowait(item)
+        return True
+
+    async def run_loop(self):
+        while True:
+            name, msg, offset = await self.queue.get()
+            try:
+                if self.is_async:
+                    await self.subscriber.print(name, msg)
+                else:
+                    await asyncio.to_thread(self.subscriber.print, name, msg)
+                if offset is not None:
+                    self.subscriber.offsets[name] = max(self.subscriber.offsets.get(name, 0), offset + 1)
+                self.delivered += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"failed to deliver to {self.subscriber.name} : {e}")
+            finally:
+                self.queue.task_done()
+
+    def get_metrics(self):
+        return {
+            "depth": self.queue.qsize(),
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+    async def stop(self):
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+
+class AsyncPubSubSystem:
+    def __init__(self, queue_size: int = 1000, policy: OverflowPolicy = OverflowPolicy.BLOCK, concurrency: int = 1):
+        self.topics: Dict[str, Topic] = {}
+        self.queues: Dict[Subscriber, AsyncSubscriberQueue] = {}
+        self.queue_size = queue_size
+        self.policy = policy
+        self.concurrency = concurrency
+
+    def create_topic(self, name: str, log_dir: Optional[str] = None, **log_options):
+        if name not in self.topics:
+            log = TopicLog(os.path.join(log_dir, name), **log_options) if log_dir else None
+            self.topics[name] = Topic(name, log)
+            print(f"created topic {name}")
+        return self.topics[name]
+
+    def subscribe(self, name: str, subscriber: Subscriber, queue_size: Optional[int] = None,
+                  policy: Optional[OverflowPolicy] = None, concurrency: Optional[int] = None):
+        topic = self.topics.get(name)
+        if topic:
+            if subscriber not in self.queues:
+                self.queues[subscriber] = AsyncSubscriberQueue(
+                    subscriber,
+                    queue_size or self.queue_size,
+                    policy or self.policy,
+                    concurrency or self.concurrency,
+                )
+            topic.add_subscriber(subscriber)
+        else:
+            print(f"topic {name} doesn't exist")
+
+    async def unsubscribe(self, name: str, subscriber: Subscriber):
+        topic = self.topics.get(name)
+        if topic:
+            topic.remove_subscriber(subscriber)
+        if not any(t.has_subscriber(subscriber) for t in self.topics.values()):
+            queue = self.queues.pop(subscriber, None)
+            if queue:
+                await queue.stop()
+
+    async def publish(self, name: str, msg: Message):
+        topic = self.topics.get(name)
+        if topic:
+            offset = topic.log.append(msg) if topic.log else None
+            for sub in topic.get_subscribers():
+                queue = self.queues.get(sub)
+                if queue:
+                    await queue.offer(name, msg, offset)
+        else:
+            print(f"topic {name} doesn't exist")
+
+    def get_metrics(self):
+        return {sub.name: queue.get_metrics() for sub, queue in self.queues.items()}
+
+    async def flush(self):
+        await asyncio.gather(*(queue.queue.join() for queue in self.queues.values()))
+
+    async def shutdown(self):
+        await self.flush()
+        await asyncio.gather(*(queue.stop() for queue in self.queues.values()))
+
+async def async_demo():
+    pss = AsyncPubSubSystem(concurrency=2)
+    pss.create_topic("events")
+
+    pss.subscribe("events", AsyncSubscriber("async-foo"))
+    pss.subscribe("events", Subscriber("threaded-bar"))
+
+    for i in range(4):
+        await pss.publish("events", Message(f"event {i}"))
+    await pss.shutdown()
+    print(pss.get_metrics())
+
+def score_payloads(name: str, msgs: List[Message]):
+    for msg in msgs:
+        print(f"pid {os.getpid()} scored {msg.msg} from {name} : {sum(msg.data[::4096])}")
 
 def demo():
     pss = PubSubSystem()
@@ -94,7 +918,7 @@ def demo():
     s2 = Subscriber("bar")
 
     pss.subscribe("a", s1)
-    pss.subscribe("a", s2)
+    pss.subscribe("a", s2, queue_size=5, policy=OverflowPolicy.DROP_OLDEST)
     pss.subscribe("b", s2)
 
     m1 = Message("msg in a")
@@ -102,6 +926,70 @@ def demo():
     pss.publish("a", m1)
     pss.publish("b", m2)
 
+    class QuickSubscriber(Subscriber):
+        def print(self, name: str, msg: Message):
+            pass
+
+    pss.subscribe("b", QuickSubscriber("quick"))
+    pss.publish_batch("b", [Message(f"burst {i}") for i in range(20)])
+
+    time.sleep(0.1)
+    for name, metrics in pss.get_metrics().items():
+        print(f"{name}: {metrics}")
+    pss.flush()
+
+    log_dir = tempfile.mkdtemp()
+    pss.create_topic("orders", log_dir=log_dir, segment_bytes=256, retention_bytes=4096)
+    reader = QuickSubscriber("reader")
+    pss.subscribe("orders", reader)
+    pss.publish_batch("orders", [Message(f"order {i}") for i in range(10)])
+    pss.flush()
+    print(f"reader committed offset {reader.offsets['orders']}")
+
+    pss.unsubscribe("orders", reader)
+    pss.publish_batch("orders", [Message(f"order {i}") for i in range(10, 15)])
+
+    restarted = Subscriber("reader-restarted")
+    restarted.offsets = dict(reader.offsets)
+    pss.subscribe("orders", restarted, max_batch=1)
+    print(f"replayed {pss.replay('orders', restarted)} missed orders")
+    pss.flush()
+
+    scorer = ProcessSubscriber("scorer", score_payloads, workers=2)
+    pss.create_topic("payloads")
+    pss.subscribe("payloads", scorer)
+    pss.publish_batch("payloads", [Message(f"payload {i}", os.urandom(OUT_OF_BAND_THRESHOLD)) for i in range(8)])
+    pss.flush()
+    pss.unsubscribe("payloads", scorer)
+    scorer.close()
+
+    pss.create_topic("clicks", partitions=4)
+    workers = [QuickSubscriber(f"click-worker-{i}") for i in range(2)]
+    for worker in workers:
+        pss.join_group("clicks", "analytics", worker)
+    pss.publish_batch("clicks", [Message(f"click {i}", key=f"user-{i % 8}") for i in range(40)])
+    pss.flush()
+    late = QuickSubscriber("click-worker-2")
+    pss.join_group("clicks", "analytics", late)
+    pss.publish_batch("clicks", [Message(f"click {i}", key=f"user-{i % 8}") for i in range(40, 80)])
+    pss.leave_group("clicks", "analytics", workers[0])
+    pss.flush()
+    for worker in (workers[1], late):
+        print(f"{worker.name} processed {pss.get_metrics()[worker.name]['delivered']} clicks")
+
+    for name in ("orders.eu.created", "orders.us.created", "orders.us.shipped"):
+        pss.create_topic(name)
+    created = QuickSubscriber("created-watcher")
+    everything = QuickSubscriber("orders-watcher")
+    pss.subscribe_pattern("orders.*.created", created)
+    pss.subscribe_pattern("orders.#", everything)
+    for name in ("orders.eu.created", "orders.us.created", "orders.us.shipped"):
+        pss.publish(name, Message(f"event on {name}"))
+    pss.flush()
+    print(f"created-watcher got {pss.get_metrics()['created-watcher']['delivered']}, "
+          f"orders-watcher got {pss.get_metrics()['orders-watcher']['delivered']}")
+
 
 if __name__ == "__main__":
-    demo()
\ No newline at end of file
+    demo()
+    asyncio.run(async_demo())
\ No newline at end of file